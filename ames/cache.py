@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+from time import perf_counter
+import numpy as np
+
+from ames.instrument import phase
+
+#=======================================================================================================
+# Bounded prediction cache
+# Prices are keyed by (PID, renovation vector) and evicted least-recently-used once maxsize is reached.
+# One instance is shared by every session in the process, so a base-house price is only predicted
+# the first time anyone views that house. All misses of one request are scored in one predict call.
+class CachedPredictor:
+    def __init__(self, model, encoder, maxsize=4096):
+        self.model = model
+        self.encoder = encoder
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.predict_calls = 0
+        self.predict_seconds = 0.0
+
+    def prices(self, pid, X, vectors):
+        # floored prices of house pid (X is its 1 x F encoded row) under each renovation vector
+        keys = [(int(pid), tuple(vector)) for vector in vectors]
+        out = np.empty(len(keys))
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    out[i] = self._cache[key]
+                    self.hits += 1
+                else:
+                    missing.append(i)
+                    self.misses += 1
+        if missing:
+            start = perf_counter()
+            with phase('predict'):
+                preds = self.encoder.predict(self.model, self.encoder.scenarios(X, [vectors[i] for i in missing]))
+            elapsed = perf_counter() - start
+            with self._lock:
+                self.predict_calls += 1
+                self.predict_seconds += elapsed
+                for i, price in zip(missing, preds):
+                    out[i] = price
+                    self._cache[keys[i]] = price
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+                    self.evictions += 1
+        return out
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._cache),
+                    'maxsize': self.maxsize,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'predict_calls': self.predict_calls,
+                    'mean_predict_ms': 1000 * self.predict_seconds / self.predict_calls if self.predict_calls else 0.0}
@@ -0,0 +1,43 @@
+import os
+
+#=======================================================================================================
+# Shared paths for the app and the offline build tools
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSET_DIR = os.environ.get('AMES_ASSET_DIR', os.path.join(ROOT_DIR, 'assets'))
+
+def asset_path(name):
+    return os.path.join(ASSET_DIR, name)
+
+# Maximum number of (PID, renovation) prices kept by the in-process prediction cache
+PREDICTION_CACHE_SIZE = int(os.environ.get('AMES_PREDICTION_CACHE_SIZE', 4096))
+
+# Background threads computing prediction intervals (ames.intervals)
+INTERVAL_WORKERS = int(os.environ.get('AMES_INTERVAL_WORKERS', 2))
+
+# Maps with more houses than this are drawn as aggregated hexagons instead of one dot per house
+MAP_POINT_LIMIT = int(os.environ.get('AMES_MAP_POINT_LIMIT', 20000))
+
+# Offline map tiles (python -m ames.tiles) and the local tile endpoint the maps use when it is up
+TILE_DIR = os.environ.get('AMES_TILE_DIR', asset_path('tiles'))
+TILE_URL = os.environ.get('AMES_TILE_URL')
+
+# Seconds between checks for a new data release published by python -m ames.ingest (0 disables)
+RELOAD_INTERVAL = float(os.environ.get('AMES_RELOAD_INTERVAL', 5))
+
+# Render cached page figures in a background thread at startup (AMES_PREWARM=0 to disable)
+PREWARM = os.environ.get('AMES_PREWARM', '1') != '0'
+
+# Points drawn per facet of the House Features scatter; larger categories are randomly downsampled
+SCATTER_POINT_LIMIT = int(os.environ.get('AMES_SCATTER_POINT_LIMIT', 5000))
+
+# Per-rerun metrics (ames.instrument): JSON lines appended per rerun, Prometheus text rewritten per rerun
+METRICS_JSONL = os.environ.get('AMES_METRICS_JSONL')
+METRICS_PROM = os.environ.get('AMES_METRICS_PROM')
+# Where ?profile=1 reruns save their cProfile (.prof) or pyinstrument (.html) output
+PROFILE_DIR = os.environ.get('AMES_PROFILE_DIR', asset_path(os.path.join('cache', 'profiles')))
+
+# Shared data arena: processes publish the house table and its views here once and memory-map them
+# read-only (a tmpfs such as /dev/shm/ames keeps it in shared memory); unset keeps data per process
+SHARED_DIR = os.environ.get('AMES_SHARED_DIR')
+# Unix socket of the shared prediction service (python -m ames.predict_service); unset loads models in-process
+PREDICT_SOCKET = os.environ.get('AMES_PREDICT_SOCKET')
@@ -0,0 +1,123 @@
+import argparse
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from ames.config import asset_path
+from ames.houses import ORDINAL_LABELS, load_houses
+from ames.instrument import phase
+from ames.models import ModelRegistry
+from ames.reno import reno_encoder
+
+#=======================================================================================================
+# Per-feature price explanations (SHAP values from CatBoost)
+# A house's predicted price is the model's expected price plus one contribution per feature.
+# Base houses are explained once, all PIDs in one batched pass, and stored as a float32 matrix:
+#
+#   python -m ames.explain      # writes assets/shap_base.npz
+#
+# Renovated houses are explained on demand and kept in a small LRU cache keyed by (PID, renovation).
+SHAP_FILE = 'shap_base.npz'
+
+def shap_values(model, X):
+    # (M x F+1) contributions of each feature to each row's prediction; the last column is the expected value
+    if hasattr(model, 'shap_values'):  # ames.predict_service.RemoteModel
+        return model.shap_values(X)
+    from catboost import Pool
+    return model.get_feature_importance(Pool(X, feature_names=list(model.feature_names_)), type='ShapValues')
+
+class Explanations:
+    def __init__(self, pids, values, expected, features):
+        self.pids = pids
+        self.values = values
+        self.expected = float(expected)
+        self.features = list(features)
+        self._rows = {pid: row for row, pid in enumerate(pids.tolist())}
+
+    def __contains__(self, pid):
+        return int(pid) in self._rows
+
+    def base(self, pid):
+        # contributions of every feature to the base price of pid, or None when it is not in the table
+        row = self._rows.get(int(pid))
+        return None if row is None else self.values[row]
+
+    def save(self, path=None):
+        np.savez(path or asset_path(SHAP_FILE), pids=self.pids, values=self.values,
+                 expected=self.expected, features=np.array(self.features))
+
+def build_explanations(model, pkl_data):
+    encoder = reno_encoder(model)
+    shap = shap_values(model, encoder.encode(pkl_data))
+    return Explanations(pkl_data.index.values.astype(np.int64), shap[:, :-1].astype(np.float32),
+                        shap[0, -1], encoder.columns)
+
+def load_explanations(model, path=None, pkl_data=None):
+    # the stored table when it matches the model's features, otherwise built now in one batch from
+    # pkl_data, the caller's houses (default: the current release)
+    path = path or asset_path(SHAP_FILE)
+    if os.path.exists(path):
+        with np.load(path) as table:
+            if table['features'].tolist() == list(model.feature_names_):
+                return Explanations(table['pids'], table['values'], table['expected'], table['features'])
+    if pkl_data is None:
+        pkl_data = load_houses().view('pickle_data')
+    with phase('shap base'):
+        return build_explanations(model, pkl_data)
+
+#------------------------------------------------------------------------------------------------------
+class ExplanationCache:
+    # Renovated-house contributions keyed by (PID, renovation vector), evicted least-recently-used
+    def __init__(self, model, encoder, maxsize=1024):
+        self.model = model
+        self.encoder = encoder
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def explain(self, pid, X, vector):
+        # contributions for house pid (X is its 1 x F encoded row) after renovation vector
+        key = (int(pid), tuple(vector))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        with phase('shap'):
+            values = shap_values(self.model, self.encoder.apply(X, vector))[0, :-1].astype(np.float32)
+        with self._lock:
+            self._cache[key] = values
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return values
+
+def feature_label(col, value):
+    # display value of an encoded model column
+    labels = ORDINAL_LABELS.get(col)
+    if labels:
+        return labels.get(int(value), str(value))
+    return f'{value:g}'
+
+def explanation_frame(features, base_row, base_shap, reno_row, reno_shap):
+    # one row per feature, largest renovation change first, then largest base contribution
+    frame = pd.DataFrame({'Feature': features,
+                          'Base value': [feature_label(c, v) for c, v in zip(features, base_row)],
+                          'Renovated value': [feature_label(c, v) for c, v in zip(features, reno_row)],
+                          'Base contribution': base_shap,
+                          'Renovated contribution': reno_shap,
+                          'Change': np.asarray(reno_shap) - np.asarray(base_shap)})
+    order = np.lexsort((-np.abs(frame['Base contribution'].values), -np.abs(frame['Change'].values)))
+    return frame.iloc[order].set_index('Feature')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompute SHAP explanations of every base house')
+    parser.add_argument('--out', default=asset_path(SHAP_FILE))
+    args = parser.parse_args(argv)
+    model = ModelRegistry().get('CBR')
+    table = build_explanations(model, load_houses().view('pickle_data'))
+    table.save(args.out)
+    print(f'{len(table.pids)} houses x {len(table.features)} features -> {args.out}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+import argparse
+import hashlib
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+from ames.config import SHARED_DIR, asset_path
+from ames.store import publish_table, read_table, store_path, write_table
+
+#=======================================================================================================
+# Canonical house table
+# One PID-indexed table holds every house attribute once, with the original labels ('TA', 'Gd'...).
+# The frames the app used to load from four CSVs are derived views built from the encoding
+# schema below, materialised on first use and cached on the HouseTable.
+# Sales ingested later (python -m ames.ingest) are published as new releases of the table,
+# store/houses.v0001, ... with their views and derived tables prebuilt; store/CURRENT names the
+# release the app loads.
+HOUSES = 'houses'
+CURRENT = 'CURRENT'
+
+# Label-encoded columns; the codes are fixed because the model was trained on them
+NEIGHBORHOODS = ('Blmngtn', 'Blueste', 'BrDale', 'BrkSide', 'ClearCr', 'CollgCr', 'Crawfor',
+                 'Edwards', 'Gilbert', 'Greens', 'GrnHill', 'IDOTRR', 'Landmrk', 'MeadowV',
+                 'Mitchel', 'NAmes', 'NPkVill', 'NWAmes', 'NoRidge', 'NridgHt', 'OldTown',
+                 'SWISU', 'Sawyer', 'SawyerW', 'Somerst', 'StoneBr', 'Timber', 'Veenker')
+SECTORS = ('DT', 'NO', 'NW', 'SE', 'SO', 'WE')
+
+# Ordinal encoding of the model input (pickle_base.csv)
+ORDINAL_CODES = {
+    'BsmtCond': {'None': 0, 'Fa': 1, 'TA': 2, 'Gd': 3, 'Ex': 3},
+    'CentralAir': {'N': 0, 'Y': 1},
+    'ExterQual': {'Fa': 1, 'TA': 2, 'Gd': 3, 'Ex': 4},
+    'FireplaceQu': {'None': 0, 'Po': 1, 'Fa': 1, 'TA': 2, 'Gd': 3, 'Ex': 4},
+    'Foundation': {'Wood': 1, 'Stone': 2, 'Slab': 3, 'BrkTil': 4, 'CBlock': 5, 'PConc': 6},
+    'GarageQual': {'None': 0, 'Po': 1, 'Fa': 1, 'TA': 2, 'Gd': 3, 'Ex': 3},
+    'HeatingQC': {'Fa': 1, 'TA': 2, 'Gd': 3, 'Ex': 4},
+    'KitchenQual': {'Po': 1, 'Fa': 1, 'TA': 2, 'Gd': 3, 'Ex': 4},
+    'MSSubClass': {'DUP2FAM': 1, '2FlPUD': 2, 'SPLIT': 3, '1FlPUD': 4, '1Fl': 5, '2Fl': 6},
+    'Neighborhood': {n: i for i, n in enumerate(NEIGHBORHOODS)},
+    'PavedDrive': {'N': 0, 'P': 1, 'Y': 1},
+}
+
+# Representative label of each ordinal code, used to expand model-input rows back into the one-hot
+# columns of the linear model (codes shared by several labels map to the most common one, and 4 is
+# the TOP_QUAL a renovation can set)
+ORDINAL_LABELS = {
+    'BsmtCond': {0: 'None', 1: 'Fa', 2: 'TA', 3: 'Gd', 4: 'Ex'},
+    'CentralAir': {0: 'N', 1: 'Y'},
+    'ExterQual': {1: 'Fa', 2: 'TA', 3: 'Gd', 4: 'Ex'},
+    'FireplaceQu': {0: 'None', 1: 'Fa', 2: 'TA', 3: 'Gd', 4: 'Ex'},
+    'Foundation': {code: label for label, code in ORDINAL_CODES['Foundation'].items()},
+    'GarageQual': {0: 'None', 1: 'Fa', 2: 'TA', 3: 'Gd', 4: 'Ex'},
+    'HeatingQC': {1: 'Fa', 2: 'TA', 3: 'Gd', 4: 'Ex'},
+    'KitchenQual': {1: 'Fa', 2: 'TA', 3: 'Gd', 4: 'Ex'},
+    'MSSubClass': {code: label for label, code in ORDINAL_CODES['MSSubClass'].items()},
+    'Neighborhood': dict(enumerate(NEIGHBORHOODS)),
+    'PavedDrive': {0: 'N', 1: 'Y'},
+}
+
+# Human readable labels of the "House Features" page (page_3_data.csv)
+PAGE3_LABELS = {
+    'BsmtCond': {'None': 'No Basement', 'Fa': 'Fair', 'TA': 'Typical', 'Gd': 'Good', 'Ex': 'Good'},
+    'GarageQual': {'None': 'No Garage', 'Po': 'Fair', 'Fa': 'Fair', 'TA': 'Typical', 'Gd': 'Good', 'Ex': 'Good'},
+    'HeatingQC': {'Fa': 'Fair', 'TA': 'Typical', 'Gd': 'Good', 'Ex': 'Excellent'},
+    'KitchenQual': {'Po': 'Fair', 'Fa': 'Fair', 'TA': 'Typical', 'Gd': 'Good', 'Ex': 'Excellent'},
+    'PavedDrive': {'N': 'N', 'P': 'Y', 'Y': 'Y'},
+}
+
+MODEL_COLUMNS = ['MSSubClass', 'Foundation', 'PavedDrive', 'BsmtUnfSF', 'AllBathBsmt', 'AllBathAbv',
+                 'HeatingQC', 'Neighborhood', 'YearBuilt', 'SalePrice', 'GarageCars', 'PorchArea',
+                 'GoodLivArea', 'CentralAir', 'KitchenQual', 'ExterQual', 'BsmtCond', 'FireplaceQu',
+                 'GarageQual', 'HasPool']
+MAP_EXTRA_COLUMNS = ['x_merc', 'y_merc', 'Sector', 'latitude', 'longitude',
+                     'YearRemodAdd', 'OverallQual', 'Prop_Addr', 'GrLivArea']
+
+# Model input columns, in the order the models were trained on
+MODEL_FEATURES = [col for col in sorted(MODEL_COLUMNS) if col != 'SalePrice']
+
+# Column layout of each derived view
+VIEWS = {
+    'map_data': ['x_merc', 'y_merc', 'Neighborhood', 'Sector', 'SalePrice', 'latitude', 'longitude',
+                 'le_Neighbor', 'le_Sector', 'MSSubClass', 'YearBuilt', 'YearRemodAdd', 'OverallQual',
+                 'Prop_Addr', 'GrLivArea'],
+    'house_data': MODEL_COLUMNS,
+    'page_3_data': MODEL_COLUMNS,
+    'pickle_data': sorted(MODEL_COLUMNS),
+}
+
+def encode(values, mapping):
+    # maps labels through a schema dict, vectorised over the categories
+    cat = pd.Categorical(values)
+    if (cat.codes == -1).any():
+        raise ValueError(f'{values.name} has missing values')
+    unknown = set(cat.categories) - set(mapping)
+    if unknown:
+        raise ValueError(f'{values.name} has labels missing from the encoding schema: {sorted(unknown)}')
+    table = np.array([mapping[c] for c in cat.categories])
+    return table[cat.codes]
+
+# Derived tables stored with each release
+MEDIAN_KEYS = ['Neighborhood', 'MSSubClass']
+
+def build_medians(houses):
+    # median size and price of each house type in each neighborhood
+    return houses.groupby(MEDIAN_KEYS, observed=True)[['GoodLivArea', 'SalePrice']].median().reset_index()
+
+def build_sector_counts(houses):
+    # number of houses of each type in each sector (the City Sectors stacked bars)
+    return houses.groupby(['Sector', 'MSSubClass'], observed=True).size().rename('n').reset_index()
+
+DERIVED = {'medians': build_medians, 'sector_counts': build_sector_counts}
+
+def build_view(houses, name):
+    # Derives one of the legacy frames from the canonical table
+    if name == 'map_data':
+        view = houses.assign(SalePrice=np.round(houses['SalePrice'] / 1000),
+                             le_Neighbor=encode(houses['Neighborhood'], ORDINAL_CODES['Neighborhood']),
+                             le_Sector=encode(houses['Sector'], {s: i for i, s in enumerate(SECTORS)}))
+    elif name == 'house_data':
+        view = houses
+    elif name == 'page_3_data':
+        view = houses.assign(**{col: encode(houses[col], labels) for col, labels in PAGE3_LABELS.items()})
+    elif name == 'pickle_data':
+        view = houses.assign(**{col: encode(houses[col], codes) for col, codes in ORDINAL_CODES.items()})
+    else:
+        raise KeyError(name)
+    return view[VIEWS[name]]
+
+class HouseTable:
+    # path: the release directory, whose prebuilt views and derived tables are used when present
+    def __init__(self, houses, arena=None, path=None):
+        self.houses = houses
+        self.arena = arena
+        self.path = path
+        self._pos = {pid: i for i, pid in enumerate(houses.index.tolist())}
+        self._views = {}
+
+    def __len__(self):
+        return len(self.houses)
+
+    def __contains__(self, pid):
+        return int(pid) in self._pos
+
+    def view(self, name):
+        # encoded views are materialised once and shared
+        if name not in self._views:
+            if self.prebuilt('views', name):
+                self._views[name] = read_table(self.prebuilt('views', name))
+            elif self.arena:
+                self._views[name] = publish_table(os.path.join(self.arena, name),
+                                                  lambda: build_view(self.houses, name))
+            else:
+                self._views[name] = build_view(self.houses, name)
+        return self._views[name]
+
+    def rows(self, pids, name='house_data'):
+        # O(1) positional lookup of PIDs in a view
+        return self.view(name).iloc[[self._pos[int(pid)] for pid in pids]]
+
+    def prebuilt(self, *parts):
+        # path of a table stored with the release, None when it has to be built
+        if self.path:
+            path = os.path.join(self.path, *parts)
+            if os.path.exists(os.path.join(path, 'meta.json')):
+                return path
+        return None
+
+    def derived(self, name):
+        # 'medians' or 'sector_counts' (see DERIVED), as a plain frame
+        path = self.prebuilt(name)
+        return read_table(path) if path else DERIVED[name](self.houses)
+
+    def medians(self):
+        return self.derived('medians').set_index(MEDIAN_KEYS)
+
+def build_canonical(model_csv=None, map_csv=None):
+    # Merges the model attributes with the map-only columns into the canonical table, in the row order
+    # of APP_data_all.csv, which the pages (sidebar lists, address table) have always shown
+    model_data = pd.read_csv(model_csv or asset_path('model_data.csv'), index_col='PID')
+    map_data = pd.read_csv(map_csv or asset_path('APP_data_all.csv'), index_col='PID')
+    houses = map_data[MAP_EXTRA_COLUMNS].join(model_data[MODEL_COLUMNS], how='inner')
+    return houses[MODEL_COLUMNS + MAP_EXTRA_COLUMNS]
+
+def current_version():
+    # name of the release the app loads: the one store/CURRENT names, the original table otherwise
+    try:
+        with open(store_path(CURRENT)) as f:
+            return f.read().strip() or HOUSES
+    except FileNotFoundError:
+        return HOUSES
+
+def release_file(path, name):
+    # a file stored with a release (reno_table.npz, shap_base.npz...), else the one in assets/,
+    # None when neither exists
+    for candidate in ([os.path.join(path, name)] if path else []) + [asset_path(name)]:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def source_files(version=None):
+    # the files the canonical table is read from: the binary store when built, otherwise the CSVs
+    meta = os.path.join(store_path(version or current_version()), 'meta.json')
+    if os.path.exists(meta):
+        return [meta]
+    return [asset_path('model_data.csv'), asset_path('APP_data_all.csv')]
+
+def source_signature(version=None):
+    # cheap identity of the source files, without reading them
+    stats = [f'{path}:{os.stat(path).st_mtime_ns}:{os.stat(path).st_size}' for path in source_files(version)]
+    return hashlib.sha1('|'.join(stats).encode()).hexdigest()[:16]
+
+def load_canonical(version=None):
+    path = store_path(version or current_version())
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return read_table(path)
+    return build_canonical()
+
+def load_shared_houses(shared_dir, version=None):
+    # The first process publishes the canonical table and, on first use, each view into
+    # shared_dir/<source signature>/; every other process memory-maps them read-only.
+    # Arenas of older source files are removed; processes still mapping them keep their pages.
+    version = version or current_version()
+    arena = os.path.join(shared_dir, source_signature(version))
+    houses = publish_table(os.path.join(arena, HOUSES), lambda: load_canonical(version))
+    for old in os.listdir(shared_dir):
+        if old != os.path.basename(arena) and '.tmp' not in old:
+            shutil.rmtree(os.path.join(shared_dir, old), ignore_errors=True)
+    return HouseTable(houses, arena, store_path(version))
+
+def load_houses(version=None):
+    # Reads a release of the canonical table (default: the current one) from the shared arena
+    # (AMES_SHARED_DIR), the binary store when built, otherwise the CSVs
+    version = version or current_version()
+    if SHARED_DIR:
+        os.makedirs(SHARED_DIR, exist_ok=True)
+        return load_shared_houses(SHARED_DIR, version)
+    return HouseTable(load_canonical(version), path=store_path(version))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the canonical house table in the binary asset store')
+    parser.add_argument('--model-csv', default=None, help='default assets/model_data.csv')
+    parser.add_argument('--map-csv', default=None, help='default assets/APP_data_all.csv')
+    args = parser.parse_args(argv)
+
+    houses = build_canonical(args.model_csv, args.map_csv)
+    for name in VIEWS:
+        build_view(houses, name)  # fail before writing if the schema does not cover the data
+    write_table(houses, store_path(HOUSES))
+    print(f'{len(houses)} houses, {len(houses.columns)} columns -> {store_path(HOUSES)}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from ames.explain import SHAP_FILE, Explanations, build_explanations
+from ames.houses import (CURRENT, MAP_EXTRA_COLUMNS, MEDIAN_KEYS, MODEL_COLUMNS, VIEWS, HouseTable,
+                         build_medians, build_view, current_version, load_canonical, release_file)
+from ames.models import MODELS, ModelRegistry, release_specs
+from ames.reno_table import TABLE_FILE, RenoTable, build_reno_table
+from ames.store import decode_categories, store_path, write_table
+from ames.utils import to_mercator
+
+#=======================================================================================================
+# Incremental ingestion of new sales
+# Sale records (the canonical columns, minus x_merc/y_merc, which are derived from latitude and
+# longitude, and optionally Sector, which defaults to the sector of the nearest known house) are
+# read in chunks and validated against the encoding schema. A new release of the house table is
+# then written next to the current one:
+#
+#   python -m ames.ingest new_sales.csv [more.csv | -] [--refresh-model]
+#
+#   store/houses.v0002/             canonical table, previous rows + new or resold PIDs
+#   store/houses.v0002/views/...    the four views, only the new rows encoded
+#   store/houses.v0002/medians      medians recomputed for the neighborhoods that had sales
+#   store/houses.v0002/sector_counts  house type counts, updated by the rows that changed
+#   store/houses.v0002/reno_table.npz, shap_base.npz   per-PID model outputs, new PIDs scored
+#   store/houses.v0002/manifest.json
+#
+# and store/CURRENT is switched to it atomically. Only the encoding, medians, counts and scoring are
+# incremental: every release is a complete copy (the table, views and per-PID files are rewritten whole,
+# O(houses) I/O) so it can be memory-mapped on its own. Running apps notice the switch, load and warm
+# the release in a background thread and swap to it once it is ready (see ames.ui.common).
+# A resold PID replaces its previous row. --refresh-model retrains the CatBoost model on the release
+# with its original parameters, stores it with the release and rescores every house.
+RELEASE = re.compile(r'^houses\.v(\d{4,})$')
+INPUT_COLUMNS = [col for col in MODEL_COLUMNS + MAP_EXTRA_COLUMNS if col not in ('x_merc', 'y_merc', 'Sector')]
+
+def read_chunks(sources, chunksize=1000):
+    # PID-indexed frames of at most chunksize records from each CSV source ('-' reads stdin)
+    for source in sources:
+        yield from pd.read_csv(sys.stdin if source == '-' else source, index_col='PID', chunksize=chunksize)
+
+def prepare(chunk, sectors):
+    # Canonical rows of one chunk of sale records; sectors is (KD-tree over known houses, their sectors).
+    # Every view is built once to reject labels the encoding schema does not cover before anything is written
+    missing = [col for col in INPUT_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise ValueError(f'sale records are missing columns: {missing}')
+    chunk = chunk[chunk.index.notna()]
+    chunk.index = chunk.index.astype(np.int64)
+    x, y = to_mercator(chunk['latitude'].values, chunk['longitude'].values)
+    tree, known = sectors
+    nearest = known[tree.query(np.column_stack([x, y]))[1]]
+    sector = chunk['Sector'].where(chunk['Sector'].notna(), nearest) if 'Sector' in chunk else nearest
+    rows = chunk.assign(x_merc=x, y_merc=y, Sector=sector)[MODEL_COLUMNS + MAP_EXTRA_COLUMNS]
+    for name in VIEWS:
+        build_view(rows, name)
+    return rows
+
+def replace_rows(old, keep, new):
+    # old rows still current, then the new ones, as plain columns with the old numeric dtypes
+    old = decode_categories(old)
+    dtypes = {col: dtype for col, dtype in old.dtypes.items() if dtype != object}
+    return pd.concat([old[keep], decode_categories(new).astype(dtypes)])
+
+def update_medians(medians, houses, neighborhoods):
+    # only the neighborhoods that had sales are recomputed
+    kept = medians[~medians['Neighborhood'].isin(neighborhoods)]
+    fresh = build_medians(houses[houses['Neighborhood'].isin(neighborhoods)])
+    return (pd.concat([decode_categories(kept), decode_categories(fresh)])
+            .sort_values(MEDIAN_KEYS).reset_index(drop=True))
+
+def update_sector_counts(counts, added, removed):
+    # house type counts plus the new rows, minus the rows they replace
+    def tally(rows, sign):
+        return rows.groupby(['Sector', 'MSSubClass']).size() * sign
+    total = (decode_categories(counts).set_index(['Sector', 'MSSubClass'])['n']
+             .add(tally(decode_categories(added), 1), fill_value=0)
+             .add(tally(decode_categories(removed), -1), fill_value=0))
+    return total[total > 0].astype(np.int64).rename('n').reset_index()
+
+def refresh_model(model, pkl_data):
+    # the same CatBoost configuration, retrained on the release
+    from catboost import CatBoostRegressor
+    params = {**model.get_params(), 'iterations': model.tree_count_, 'verbose': False, 'allow_writing_files': False}
+    fresh = CatBoostRegressor(**params)
+    fresh.fit(pkl_data[list(model.feature_names_)], pkl_data['SalePrice'])
+    return fresh
+
+def next_release():
+    numbers = [int(m.group(1)) for m in map(RELEASE.match, os.listdir(store_path(''))) if m] \
+        if os.path.isdir(store_path('')) else []
+    return f'houses.v{max(numbers, default=0) + 1:04d}'
+
+def write_json(path, data):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+def ingest(chunks, refresh=False, base=None):
+    # Builds a release of the current one (or base) plus the sale records in chunks, publishes it
+    # and returns its manifest
+    base = base or current_version()
+    table = HouseTable(load_canonical(base), path=store_path(base))
+    houses = table.houses
+    sectors = (cKDTree(np.column_stack([houses['x_merc'].values, houses['y_merc'].values])),
+               np.asarray(houses['Sector']))
+    new = pd.concat([prepare(chunk, sectors) for chunk in chunks])
+    new = new[~new.index.duplicated(keep='last')]
+    if new.empty:
+        raise ValueError('no sale records to ingest')
+    keep = ~houses.index.isin(new.index)
+    removed = houses[~keep]
+    neighborhoods = sorted(set(new['Neighborhood']) | set(removed['Neighborhood']))
+
+    version = next_release()
+    path = store_path(version)
+    tmp = f'{path}.tmp{os.getpid()}'
+    merged = replace_rows(houses, keep, new)
+    write_table(merged, tmp)
+    views = {}
+    for name in VIEWS:
+        views[name] = replace_rows(table.view(name), keep, build_view(new, name))
+        write_table(views[name], os.path.join(tmp, 'views', name))
+    write_table(update_medians(table.derived('medians'), merged, neighborhoods), os.path.join(tmp, 'medians'))
+    write_table(update_sector_counts(table.derived('sector_counts'), new, removed), os.path.join(tmp, 'sector_counts'))
+
+    # Model and per-PID model outputs
+    pkl_data = views['pickle_data']
+    fresh = new.index.values
+    specs = release_specs(table.path)
+    if refresh:
+        model = refresh_model(ModelRegistry(specs, socket=None).get('CBR'), pkl_data)
+        model.save_model(os.path.join(tmp, MODELS['CBR']['cbm']), format='cbm')
+        fresh = pkl_data.index.values
+    else:
+        if specs is not MODELS:  # a model refreshed by an earlier release
+            shutil.copy2(specs['CBR']['cbm'], os.path.join(tmp, MODELS['CBR']['cbm']))
+        model = ModelRegistry(specs).get('CBR')
+    scored = pkl_data.loc[fresh]
+    previous = release_file(table.path, TABLE_FILE)
+    if previous:
+        with np.load(previous) as old:
+            old_keep = ~np.isin(old['pids'], fresh)
+            part = build_reno_table(model, scored)
+            RenoTable(np.concatenate([old['pids'][old_keep], part.pids]),
+                      np.concatenate([old['prices'][old_keep], part.prices])).save(os.path.join(tmp, TABLE_FILE))
+    previous = release_file(table.path, SHAP_FILE)
+    if previous:
+        with np.load(previous) as old:
+            old_keep = ~np.isin(old['pids'], fresh)
+            part = build_explanations(model, scored)
+            Explanations(np.concatenate([old['pids'][old_keep], part.pids]),
+                         np.concatenate([old['values'][old_keep], part.values]),
+                         part.expected, part.features).save(os.path.join(tmp, SHAP_FILE))
+
+    manifest = {'version': version, 'parent': base, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'rows': len(merged), 'added': int((~new.index.isin(houses.index)).sum()),
+                'resold': int((~keep).sum()), 'neighborhoods': neighborhoods,
+                'sectors': sorted(set(new['Sector']) | set(removed['Sector'])),
+                'model': 'refreshed' if refresh else ('inherited' if specs is not MODELS else 'original')}
+    write_json(os.path.join(tmp, 'manifest.json'), manifest)
+    os.rename(tmp, path)
+    # readers see the old release or the complete new one, never a partial one
+    with open(store_path(CURRENT) + '.tmp', 'w') as f:
+        f.write(version)
+    os.replace(store_path(CURRENT) + '.tmp', store_path(CURRENT))
+    return manifest
+
+def prune(keep=3):
+    # removes all but the newest releases, never the current one; apps still mapping them keep their pages
+    current = current_version()
+    releases = sorted(name for name in os.listdir(store_path('')) if RELEASE.match(name))
+    for name in releases[:max(len(releases) - keep, 0)]:
+        if name != current:
+            shutil.rmtree(store_path(name), ignore_errors=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Add new sales to the house data as a new release')
+    parser.add_argument('sources', nargs='+', help="CSV files of sale records with a PID column, '-' for stdin")
+    parser.add_argument('--chunksize', type=int, default=1000)
+    parser.add_argument('--refresh-model', action='store_true', help='retrain the CatBoost model on the release')
+    parser.add_argument('--keep', type=int, default=3, help='releases to keep (default 3)')
+    args = parser.parse_args(argv)
+    manifest = ingest(read_chunks(args.sources, args.chunksize), args.refresh_model)
+    prune(args.keep)
+    print(f"{manifest['added']} new and {manifest['resold']} resold houses -> {store_path(manifest['version'])} "
+          f"({manifest['rows']} houses, model {manifest['model']})")
+
+if __name__ == '__main__':
+    main()
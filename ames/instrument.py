@@ -0,0 +1,172 @@
+import io
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from time import perf_counter
+
+from ames.config import METRICS_JSONL, METRICS_PROM, PROFILE_DIR
+
+#=======================================================================================================
+# Per-rerun timing and memory instrumentation
+# app.py opens a RerunTimer for every rerun; code anywhere below it marks phases with
+#
+#   with phase('predict'):
+#       ...
+#
+# Phases record wall time and resident memory growth, and may nest. Outside a rerun (build tools, the prewarm
+# thread) phase() does nothing. Finished reruns are added to process-wide totals and, when
+# configured, appended to AMES_METRICS_JSONL and written as Prometheus text to AMES_METRICS_PROM.
+_local = threading.local()
+
+def rss_mb():
+    # current resident set size, peak RSS where /proc is not available
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class RerunTimer:
+    def __init__(self, page=None):
+        self.page = page
+        self.phases = []
+        self.start = perf_counter()
+        self.rss = rss_mb()
+        self.profile = None
+        self.profile_path = self.profile_text = None
+
+    def record(self):
+        rss = rss_mb()
+        return {'ts': time.time(),
+                'page': self.page,
+                'total_ms': 1000 * (perf_counter() - self.start),
+                'rss_mb': rss,
+                'rss_delta_mb': rss - self.rss,
+                'phases': [{'phase': name, 'ms': 1000 * seconds, 'rss_delta_mb': mb}
+                           for name, seconds, mb in self.phases]}
+
+def current_timer():
+    return getattr(_local, 'timer', None)
+
+@contextmanager
+def phase(name):
+    timer = current_timer()
+    if timer is None:
+        yield
+        return
+    start = perf_counter()
+    rss = rss_mb()
+    try:
+        yield
+    finally:
+        timer.phases.append((name, perf_counter() - start, rss_mb() - rss))
+
+#------------------------------------------------------------------------------------------------------
+# Process-wide totals
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reruns = {}  # page -> [count, seconds]
+        self.phases = {}  # phase -> [count, seconds]
+        self.last = None
+
+    def add(self, record):
+        with self._lock:
+            totals = self.reruns.setdefault(record['page'], [0, 0.0])
+            totals[0] += 1
+            totals[1] += record['total_ms'] / 1000
+            for p in record['phases']:
+                totals = self.phases.setdefault(p['phase'], [0, 0.0])
+                totals[0] += 1
+                totals[1] += p['ms'] / 1000
+            self.last = record
+
+    def prometheus(self):
+        with self._lock:
+            lines = ['# HELP ames_rerun_seconds Wall time of app reruns by page',
+                     '# TYPE ames_rerun_seconds summary']
+            for page, (count, seconds) in sorted(self.reruns.items()):
+                lines.append(f'ames_rerun_seconds_sum{{page="{page}"}} {seconds:.6f}')
+                lines.append(f'ames_rerun_seconds_count{{page="{page}"}} {count}')
+            lines += ['# HELP ames_phase_seconds Wall time of instrumented rerun phases',
+                      '# TYPE ames_phase_seconds summary']
+            for name, (count, seconds) in sorted(self.phases.items()):
+                lines.append(f'ames_phase_seconds_sum{{phase="{name}"}} {seconds:.6f}')
+                lines.append(f'ames_phase_seconds_count{{phase="{name}"}} {count}')
+            lines += ['# HELP ames_resident_memory_megabytes Resident memory at the end of the last rerun',
+                      '# TYPE ames_resident_memory_megabytes gauge',
+                      f"ames_resident_memory_megabytes {self.last['rss_mb'] if self.last else rss_mb():.1f}"]
+        return '\n'.join(lines) + '\n'
+
+METRICS = Metrics()
+
+def write_metrics(record, jsonl=METRICS_JSONL, prom=METRICS_PROM):
+    if jsonl:
+        with open(jsonl, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    if prom:
+        # replaced atomically so a scraper never reads a half-written file
+        with open(prom + '.tmp', 'w') as f:
+            f.write(METRICS.prometheus())
+        os.replace(prom + '.tmp', prom)
+
+#------------------------------------------------------------------------------------------------------
+# Profiling of a single rerun (cProfile, or pyinstrument when installed and asked for)
+class RerunProfiler:
+    def __init__(self, kind='cprofile'):
+        self.kind = kind
+        if kind == 'pyinstrument':
+            from pyinstrument import Profiler
+            self._profiler = Profiler()
+        else:
+            import cProfile
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        (self._profiler.start if self.kind == 'pyinstrument' else self._profiler.enable)()
+
+    def stop(self, page, directory=PROFILE_DIR, top=25):
+        # saves the profile and returns (path, text summary)
+        os.makedirs(directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{str(page).replace(' ', '_')}"
+        if self.kind == 'pyinstrument':
+            self._profiler.stop()
+            path = os.path.join(directory, name + '.html')
+            with open(path, 'w') as f:
+                f.write(self._profiler.output_html())
+            return path, self._profiler.output_text()
+        import pstats
+        self._profiler.disable()
+        path = os.path.join(directory, name + '.prof')
+        self._profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(top)
+        return path, out.getvalue()
+
+#------------------------------------------------------------------------------------------------------
+def start_rerun(page=None, profile=None):
+    # profile: None, 'pyinstrument', or anything else for cProfile
+    timer = RerunTimer(page)
+    if profile:
+        try:
+            timer.profile = RerunProfiler('pyinstrument' if profile == 'pyinstrument' else 'cprofile')
+        except ImportError:
+            timer.profile = RerunProfiler()
+        timer.profile.start()
+    _local.timer = timer
+    return timer
+
+def finish_rerun():
+    timer = current_timer()
+    if timer is None:
+        return None
+    _local.timer = None
+    if timer.profile:
+        timer.profile_path, timer.profile_text = timer.profile.stop(timer.page)
+    record = timer.record()
+    METRICS.add(record)
+    write_metrics(record)
+    return record
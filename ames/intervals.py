@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from statistics import NormalDist
+import numpy as np
+
+from ames.config import INTERVAL_WORKERS
+
+#=======================================================================================================
+# Prediction intervals from CatBoost virtual ensembles
+# The model's trees are split into VIRTUAL_ENSEMBLES truncated sub-models; the spread of their
+# predictions measures how unsure the model is about a house (knowledge uncertainty). Intervals are
+# centred on the model's point estimate: point +/- z * std of the sub-model predictions.
+# They are computed on a background thread pool so pages can show the point estimate first, and
+# cached per (PID, renovation vector). Concurrent requests for the same key share one computation.
+VIRTUAL_ENSEMBLES = 10
+LEVEL = 0.95
+
+def ensemble_predictions(model, X, count=VIRTUAL_ENSEMBLES):
+    # (M rows x count) predictions of the virtual ensemble members
+    if hasattr(model, 'ensemble_predictions'):  # ames.predict_service.RemoteModel
+        return model.ensemble_predictions(X, count)
+    return model.virtual_ensembles_predict(X, prediction_type='VirtEnsembles',
+                                           virtual_ensembles_count=count)[:, :, 0]
+
+def prediction_intervals(model, X, level=LEVEL, count=VIRTUAL_ENSEMBLES):
+    # (M x 2) floored (low, high) price bounds of every row of X
+    point = model.predict(X)
+    half = NormalDist().inv_cdf((1 + level) / 2) * ensemble_predictions(model, X, count).std(axis=1, ddof=1)
+    return np.floor(np.column_stack([point - half, point + half]))
+
+class IntervalPredictor:
+    def __init__(self, model, encoder, workers=INTERVAL_WORKERS, maxsize=4096):
+        self.model = model
+        self.encoder = encoder
+        self.maxsize = maxsize
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='intervals')
+        self._cache = OrderedDict()  # (pid, vector) -> (future, row of the future's result)
+        self._lock = threading.Lock()
+
+    def submit(self, pid, X, vectors):
+        # futures of the (low, high) interval of house pid (X is its 1 x F encoded row) under each vector;
+        # keys not cached or in flight are scored together in one background task
+        keys = [(int(pid), tuple(vector)) for vector in vectors]
+        with self._lock:
+            missing = [i for i, key in enumerate(keys) if key not in self._cache]
+            if missing:
+                task = self._pool.submit(prediction_intervals, self.model,
+                                         self.encoder.scenarios(X, [vectors[i] for i in missing]))
+                task.add_done_callback(self._forget_failed)
+                for row, i in enumerate(missing):
+                    self._cache[keys[i]] = (task, row)
+            entries = []
+            for key in keys:
+                self._cache.move_to_end(key)
+                entries.append(self._cache[key])
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return [_Interval(task, row) for task, row in entries]
+
+    def shutdown(self):
+        # stops the workers once queued tasks finish; called when the data release is dropped
+        self._pool.shutdown(wait=False)
+
+    def _forget_failed(self, task):
+        # failed tasks are dropped so the next request retries them
+        if task.exception() is not None:
+            with self._lock:
+                for key in [key for key, (t, _) in self._cache.items() if t is task]:
+                    del self._cache[key]
+
+class _Interval:
+    # one row of a batched interval task, with the Future interface pages need
+    def __init__(self, task, row):
+        self._task = task
+        self._row = row
+
+    def done(self):
+        return self._task.done()
+
+    def result(self, timeout=None):
+        return tuple(self._task.result(timeout)[self._row])
@@ -0,0 +1,162 @@
+import argparse
+import os
+import pickle
+import threading
+from time import perf_counter
+import numpy as np
+
+from ames.config import PREDICT_SOCKET, asset_path
+from ames.instrument import phase, rss_mb
+from ames.houses import MODEL_COLUMNS, MODEL_FEATURES, ORDINAL_CODES, ORDINAL_LABELS
+from ames.predict_service import RemoteModel, ensure_service
+
+#=======================================================================================================
+# Model registry
+# Every model is loaded once per process, warmed up with one dummy prediction (the first predict
+# call pays for lazy initialisation) and timed. All models take the same float64 input matrix in
+# MODEL_FEATURES order (see ames.reno.RenoEncoder), so one batch can be scored by every model.
+#
+#   python -m ames.models      # writes assets/APP_model_CBR.cbm, CatBoost's native format
+MODELS = {
+    'CBR': {'label': 'CatBoost', 'cbm': 'APP_model_CBR.cbm', 'pkl': 'APP_model_CBR.pkl'},
+    # small enough to load in every process, and its labelled predictions need the houses' own rows
+    'MLR': {'label': 'Linear (Lasso)', 'pkl': 'APP_model_MLR.pkl', 'local': True},
+}
+
+#------------------------------------------------------------------------------------------------------
+# Linear model adapter
+class LogLinearModel:
+    # The MLR was fitted on pd.get_dummies(model_data, drop_first=True) with a log10(SalePrice) target.
+    # The ordinal input matrix is expanded to those one-hot columns with one lookup table per
+    # categorical column, so it scores the same rows as the CatBoost model.
+    # Codes shared by several labels (Po/Fa, P/Y, Gd/Ex) expand to one representative label, which moves
+    # 111 of 2579 houses by more than 1% (up to 15.5%, KitchenQual Po); predict_labelled takes the
+    # houses' own labels and matches the original model on every unrenovated column
+    def __init__(self, estimator, feature_names=MODEL_FEATURES):
+        self.estimator = estimator
+        self.feature_names_ = list(feature_names)
+        pos = {col: i for i, col in enumerate(self.feature_names_)}
+        # get_dummies layout: numeric columns, then each categorical column's labels but the first
+        order = [col for col in MODEL_COLUMNS if col in pos]
+        self._numeric = [pos[col] for col in order if col not in ORDINAL_CODES]
+        self._onehot = []
+        for col in [col for col in order if col in ORDINAL_CODES]:
+            dummies = sorted(ORDINAL_CODES[col])[1:]
+            table = np.zeros((max(ORDINAL_LABELS[col]) + 1, len(dummies)))
+            for code, label in ORDINAL_LABELS[col].items():
+                if label in dummies:
+                    table[code, dummies.index(label)] = 1
+            self._onehot.append((col, pos[col], table, dummies))
+        n_columns = len(self._numeric) + sum(len(dummies) for *_, dummies in self._onehot)
+        if n_columns != len(estimator.coef_):
+            raise ValueError(f'{n_columns} one-hot columns for a model with {len(estimator.coef_)} coefficients')
+
+    def design(self, X, labels=None):
+        # labels: canonical rows (house_data) of the houses, one per row of X; a column whose code is
+        # still the code of the house's label (not renovated) is expanded from that label
+        X = np.asarray(X, dtype=np.float64)
+        blocks = [X[:, self._numeric]]
+        for col, i, table, dummies in self._onehot:
+            codes = X[:, i].astype(int)
+            block = table[codes]
+            if labels is not None:
+                own = np.asarray(labels[col]).astype(str)
+                kept = np.array([ORDINAL_CODES[col].get(label) for label in own]) == codes
+                exact = (own[:, None] == np.array(dummies)[None, :]).astype(np.float64)
+                block = np.where(kept[:, None], exact, block)
+            blocks.append(block)
+        return np.hstack(blocks)
+
+    def predict(self, X):
+        return 10 ** (self.design(X) @ self.estimator.coef_ + self.estimator.intercept_)
+
+    def predict_labelled(self, X, labels):
+        return 10 ** (self.design(X, labels) @ self.estimator.coef_ + self.estimator.intercept_)
+
+#------------------------------------------------------------------------------------------------------
+def load_cbr(spec):
+    # the native format loads without unpickling the Python wrapper
+    path = asset_path(spec['cbm'])
+    if os.path.exists(path):
+        from catboost import CatBoostRegressor
+        model = CatBoostRegressor()
+        model.load_model(path)
+        return model, path
+    with open(asset_path(spec['pkl']), 'rb') as f:
+        return pickle.load(f), asset_path(spec['pkl'])
+
+def load_mlr(spec):
+    with open(asset_path(spec['pkl']), 'rb') as f:
+        return LogLinearModel(pickle.load(f)), asset_path(spec['pkl'])
+
+LOADERS = {'CBR': load_cbr, 'MLR': load_mlr}
+
+def release_specs(path):
+    # models of a data release: a CatBoost model refreshed by python -m ames.ingest --refresh-model
+    # is stored with the release and replaces the original one
+    cbm = os.path.join(path, MODELS['CBR']['cbm']) if path else None
+    if cbm and os.path.exists(cbm):
+        return {**MODELS, 'CBR': {**MODELS['CBR'], 'cbm': cbm}}
+    return MODELS
+
+class ModelRegistry:
+    # with a prediction service socket (AMES_PREDICT_SOCKET) models are proxies to the shared
+    # service, started on first use if needed; without one, or if it cannot start, they load here.
+    # The service serves the original models, so refreshed ones (release_specs) always load here, as do
+    # models marked local
+    def __init__(self, specs=MODELS, socket=PREDICT_SOCKET):
+        self.specs = specs
+        self.socket = socket
+        self._models = {}
+        self._info = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._models:
+                rss = rss_mb()
+                start = perf_counter()
+                with phase(f'load model {name}'):
+                    if (self.socket and self.specs[name] == MODELS.get(name) and not self.specs[name].get('local')
+                            and ensure_service(self.socket)):
+                        model, path = RemoteModel(name, self.socket), self.socket
+                    else:
+                        model, path = LOADERS[name](self.specs[name])
+                    loaded = perf_counter()
+                    model.predict(np.zeros((1, len(model.feature_names_))))
+                self._models[name] = model
+                self._info[name] = {'model': self.specs[name]['label'],
+                                    'file': os.path.basename(path),
+                                    'load_ms': 1000 * (loaded - start),
+                                    'warmup_ms': 1000 * (perf_counter() - loaded),
+                                    'memory_mb': rss_mb() - rss}
+            return self._models[name]
+
+    def predict(self, X, names=None, labels=None):
+        # floored prices of every row of X from each model; labels (the house_data rows of X's houses)
+        # are passed to the models that use them, see LogLinearModel
+        def predict(model):
+            if labels is not None and hasattr(model, 'predict_labelled'):
+                return model.predict_labelled(X, labels)
+            return model.predict(X)
+        return {name: np.floor(predict(self.get(name))) for name in (names or self.specs)}
+
+    def info(self):
+        with self._lock:
+            return dict(self._info)
+
+def export_cbm(out=None):
+    with open(asset_path(MODELS['CBR']['pkl']), 'rb') as f:
+        model = pickle.load(f)
+    out = out or asset_path(MODELS['CBR']['cbm'])
+    model.save_model(out, format='cbm')
+    return out
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the CatBoost model to its native .cbm format')
+    parser.add_argument('--out', default=None, help='default assets/APP_model_CBR.cbm')
+    args = parser.parse_args(argv)
+    print(f'-> {export_cbm(args.out)}')
+
+if __name__ == '__main__':
+    main()
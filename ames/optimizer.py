@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from ames.reno import NO_RENO, RENO_COLUMNS, reno_grid, reno_label
+
+#=======================================================================================================
+# Budget-constrained renovation search
+# Every renovation vector the page offers is costed, the ones over budget or using a toggle that does
+# nothing for the house are dropped, and the rest are scored in one batched predict call.
+# Default cost assumptions in dollars; 'baths' is the cost of one full above-ground bathroom
+DEFAULT_COSTS = {'baths': 25000, 'kitchen': 30000, 'bsmt': 15000, 'fin_bsmt': 35000,
+                 'garage': 10000, 'pool': 50000, 'central_air': 8000, 'paved_drive': 6000}
+
+def grid_costs(costs, grid=None):
+    # cost of every renovation vector in the grid
+    grid = np.asarray(grid if grid is not None else reno_grid(), dtype=np.float64)
+    return grid @ np.array([costs[col] for col in RENO_COLUMNS], dtype=np.float64)
+
+def applicable_toggles(encoder, X):
+    # (M houses x 7 toggles) mask of the toggles that change each house
+    # e.g. no basement to remodel, already has a pool, kitchen already excellent
+    n_toggles = len(RENO_COLUMNS) - 1
+    mask = np.empty((len(X), n_toggles), dtype=bool)
+    for t in range(n_toggles):
+        vector = [0.0] + [0]*n_toggles
+        vector[t+1] = 1
+        mask[:, t] = (encoder.apply(X, vector) != X).any(axis=1)
+    return mask
+
+def feasible(encoder, X, costs, budget):
+    # (M houses x G vectors) mask of renovations within budget that only use applicable toggles
+    grid = np.asarray(reno_grid(), dtype=np.float64)
+    toggles = grid[:, 1:].astype(bool)
+    usable = applicable_toggles(encoder, X)
+    ok = ~(toggles[None, :, :] & ~usable[:, None, :]).any(axis=2)
+    ok &= (grid_costs(costs, grid) <= budget)[None, :]
+    ok[:, 0] = False  # doing nothing is not a renovation
+    return ok
+
+def best_renovations(model, encoder, X, costs, budget, top=10):
+    # Ranks every feasible renovation of one house (X is 1 x F) by uplift per dollar
+    grid = reno_grid()
+    cols = np.flatnonzero(feasible(encoder, X, costs, budget)[0])
+    if not len(cols):
+        return pd.DataFrame(columns=['Renovation', 'Cost', 'Price', 'Uplift', 'Uplift per $'])
+    vectors = [grid[0]] + [grid[c] for c in cols]
+    prices = encoder.predict(model, encoder.scenarios(X, vectors))
+    cost = grid_costs(costs, [grid[c] for c in cols])
+    uplift = prices[1:] - prices[0]
+    ranked = pd.DataFrame({'Renovation': [reno_label(grid[c]) for c in cols],
+                           'Cost': cost, 'Price': prices[1:], 'Uplift': uplift,
+                           'Uplift per $': uplift / cost})
+    return ranked.sort_values('Uplift per $', ascending=False).head(top).reset_index(drop=True)
+
+def _grid_prices(model, encoder, X):
+    # (M houses x G vectors) prices of a chunk of houses under the whole grid
+    grid = reno_grid()
+    return model.predict(encoder.scenarios(X, grid)).reshape(len(grid), len(X)).T
+
+def best_houses(model, encoder, pids, X, costs, budget, table=None, workers=4, chunk=64):
+    # Ranks houses by the best uplift per dollar they can reach within budget
+    # Prices come from the renovation table (ames.reno_table) for the houses it holds; the others are
+    # scored in chunks on parallel threads (CatBoost releases the GIL while predicting)
+    grid = reno_grid()
+    ok = feasible(encoder, X, costs, budget)
+    cost = grid_costs(costs)
+    rows = table.rows(pids) if table is not None else np.full(len(X), -1)
+    prices = np.empty((len(X), len(grid)))
+    stored = rows >= 0
+    if stored.any():
+        prices[stored] = table.prices[rows[stored]]
+    live = np.flatnonzero(~stored)
+    if len(live):
+        starts = range(0, len(live), chunk)
+        with ThreadPoolExecutor(workers) as pool:
+            parts = list(pool.map(lambda s: _grid_prices(model, encoder, X[live[s:s+chunk]]), starts))
+        prices[live] = np.concatenate(parts)
+    uplift = np.floor(prices) - np.floor(prices[:, :1])
+    roi = np.where(ok, uplift / np.where(cost > 0, cost, 1), -np.inf)
+    best = roi.argmax(axis=1)
+    uplift = uplift[np.arange(len(X)), best]
+    roi = roi[np.arange(len(X)), best]
+    found = np.isfinite(roi)
+    ranked = pd.DataFrame({'PID': np.asarray(pids)[found],
+                           'Renovation': [reno_label(grid[b]) for b in best[found]],
+                           'Cost': cost[best[found]], 'Uplift': uplift[found],
+                           'Uplift per $': roi[found]})
+    return ranked.sort_values('Uplift per $', ascending=False).reset_index(drop=True)
+
+class RankingCache:
+    # best_houses rankings keyed by (houses, costs, budget), evicted least-recently-used; one instance
+    # per data release is shared by every session, so a rerun with unchanged inputs does no scoring
+    def __init__(self, model, encoder, houses, table=None, maxsize=64):
+        self.model = model
+        self.encoder = encoder
+        self.houses = houses
+        self.table = table
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def rank(self, pids, costs, budget):
+        key = (tuple(int(pid) for pid in pids), tuple(costs[col] for col in RENO_COLUMNS), float(budget))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        X = self.encoder.encode(self.houses.rows(pids, 'pickle_data'))
+        ranked = best_houses(self.model, self.encoder, pids, X, costs, budget, self.table)
+        with self._lock:
+            self._cache[key] = ranked
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return ranked
+
+#=======================================================================================================
+# Uplift of one renovation across many houses
+def uplift(model, encoder, X, vector):
+    # base price, dollar and percent uplift of every house under one renovation, scored in one
+    # predict call; houses the renovation does not change (no basement, already paved...) are masked out
+    prices = encoder.predict(model, encoder.scenarios(X, [NO_RENO, vector])).reshape(2, len(X))
+    applies = (encoder.apply(X, vector) != X).any(axis=1)
+    gain = prices[1] - prices[0]
+    return {'base': prices[0], 'uplift': gain, 'uplift_pct': 100 * gain / prices[0], 'applies': applies}
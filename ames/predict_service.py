@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+
+from ames.config import PREDICT_SOCKET, ROOT_DIR
+
+#=======================================================================================================
+# Shared prediction service
+# One process loads the models and answers predict requests from every app process on the box over
+# a Unix socket. Requests arriving within BATCH_WINDOW of each other are stacked into one predict
+# call per model (micro-batching), so N workers cost one model in memory and few predict calls.
+#
+#   python -m ames.predict_service --socket /tmp/ames-predict.sock
+#
+# App processes use it when AMES_PREDICT_SOCKET is set (see ames.models.ModelRegistry) and start
+# it themselves if nobody has. Messages are two 4-byte lengths, a JSON header and float64 rows:
+#   request  {"op": "predict", "model": "CBR", "rows": n, "cols": f} + n*f floats
+#            {"op": "meta", "model": "CBR"}
+#            {"op": "shap", "model": "CBR", "rows": n, "cols": f} + n*f floats (not batched)
+#            {"op": "ensembles", "model": "CBR", "rows": n, "cols": f, "count": k} + n*f floats (not batched)
+#   response {"rows": n} + n floats, or {"error": "..."}
+BATCH_WINDOW = 0.002  # seconds to wait for more requests once one has arrived
+MAX_BATCH_ROWS = 65536
+
+def send_message(sock, header, array=None):
+    body = json.dumps(header).encode()
+    payload = b'' if array is None else np.ascontiguousarray(array, dtype=np.float64).tobytes()
+    sock.sendall(struct.pack('>II', len(body), len(payload)) + body + payload)
+
+def recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError('prediction service connection closed')
+        buf += chunk
+    return bytes(buf)
+
+def recv_message(sock):
+    n_header, n_payload = struct.unpack('>II', recv_exact(sock, 8))
+    header = json.loads(recv_exact(sock, n_header))
+    payload = np.frombuffer(recv_exact(sock, n_payload), dtype=np.float64) if n_payload else None
+    return header, payload
+
+#------------------------------------------------------------------------------------------------------
+# Server
+class MicroBatcher:
+    # one thread owns the models; connection threads hand it (model, X) and wait for their rows
+    def __init__(self, registry, window=BATCH_WINDOW, max_rows=MAX_BATCH_ROWS):
+        self.registry = registry
+        self.window = window
+        self.max_rows = max_rows
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+        threading.Thread(target=self._run, name='micro-batcher', daemon=True).start()
+
+    def predict(self, name, X):
+        done = threading.Event()
+        item = {'model': name, 'X': X, 'done': done}
+        self._queue.put(item)
+        done.wait()
+        if 'error' in item:
+            raise item['error']
+        return item['y']
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            rows = len(batch[0]['X'])
+            deadline = time.monotonic() + self.window
+            while rows < self.max_rows:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item['X'])
+            by_model = {}
+            for item in batch:
+                by_model.setdefault(item['model'], []).append(item)
+            for name, items in by_model.items():
+                try:
+                    y = self.registry.get(name).predict(np.vstack([item['X'] for item in items]))
+                    start = 0
+                    for item in items:
+                        item['y'] = y[start:start + len(item['X'])]
+                        start += len(item['X'])
+                except Exception as e:
+                    for item in items:
+                        item['error'] = e
+                self.batches += 1
+                self.requests += len(items)
+            for item in batch:
+                item['done'].set()
+
+class PredictHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        batcher = self.server.batcher
+        while True:
+            try:
+                header, payload = recv_message(self.request)
+            except (ConnectionError, struct.error):
+                return
+            try:
+                if header['op'] == 'meta':
+                    model = batcher.registry.get(header['model'])
+                    send_message(self.request, {'feature_names': list(model.feature_names_),
+                                                'cat_features': list(getattr(model, 'get_cat_feature_indices', list)())})
+                elif header['op'] == 'stats':
+                    send_message(self.request, {'batches': batcher.batches, 'requests': batcher.requests,
+                                                'pid': os.getpid()})
+                elif header['op'] == 'shap':
+                    from ames.explain import shap_values
+                    X = payload.reshape(header['rows'], header['cols'])
+                    shap = shap_values(batcher.registry.get(header['model']), X)
+                    send_message(self.request, {'rows': shap.shape[0], 'cols': shap.shape[1]}, shap)
+                elif header['op'] == 'ensembles':
+                    from ames.intervals import ensemble_predictions
+                    X = payload.reshape(header['rows'], header['cols'])
+                    members = ensemble_predictions(batcher.registry.get(header['model']), X, header['count'])
+                    send_message(self.request, {'rows': members.shape[0], 'cols': members.shape[1]}, members)
+                else:
+                    X = payload.reshape(header['rows'], header['cols'])
+                    y = batcher.predict(header['model'], X)
+                    send_message(self.request, {'rows': len(y)}, y)
+            except Exception as e:
+                send_message(self.request, {'error': f'{type(e).__name__}: {e}'})
+
+class PredictServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(path, preload=('CBR',)):
+    from ames.models import ModelRegistry
+    registry = ModelRegistry(socket=None)  # the service itself loads the models
+    for name in preload:
+        registry.get(name)
+    if os.path.exists(path):
+        os.unlink(path)
+    server = PredictServer(path, PredictHandler)
+    server.batcher = MicroBatcher(registry)
+    print(f'prediction service on {path} (pid {os.getpid()})', file=sys.stderr)
+    server.serve_forever()
+
+#------------------------------------------------------------------------------------------------------
+# Client
+class RemoteModel:
+    # Stands in for a loaded model: predict() goes to the service, one connection per thread
+    def __init__(self, name, path=PREDICT_SOCKET):
+        self.name = name
+        self.path = path
+        self._local = threading.local()
+        meta = self._request({'op': 'meta', 'model': name})[0]
+        self.feature_names_ = meta['feature_names']
+        self._cat_features = meta['cat_features']
+
+    def _request(self, header, array=None):
+        for attempt in (0, 1):  # reconnect once if the service restarted
+            sock = getattr(self._local, 'sock', None)
+            try:
+                if sock is None:
+                    sock = self._local.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    sock.connect(self.path)
+                send_message(sock, header, array)
+                reply, payload = recv_message(sock)
+                break
+            except OSError:
+                if sock is not None:
+                    sock.close()
+                self._local.sock = None
+                if attempt:
+                    raise
+        if 'error' in reply:
+            raise RuntimeError(f"prediction service: {reply['error']}")
+        return reply, payload
+
+    def get_cat_feature_indices(self):
+        return self._cat_features
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        return self._request({'op': 'predict', 'model': self.name, 'rows': X.shape[0], 'cols': X.shape[1]}, X)[1]
+
+    def shap_values(self, X):
+        # see ames.explain.shap_values, computed by the service's model
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        reply, payload = self._request({'op': 'shap', 'model': self.name, 'rows': X.shape[0], 'cols': X.shape[1]}, X)
+        return payload.reshape(reply['rows'], reply['cols'])
+
+    def ensemble_predictions(self, X, count):
+        # see ames.intervals.ensemble_predictions, computed by the service's model
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        reply, payload = self._request({'op': 'ensembles', 'model': self.name, 'rows': X.shape[0],
+                                        'cols': X.shape[1], 'count': count}, X)
+        return payload.reshape(reply['rows'], reply['cols'])
+
+def service_stats(path=PREDICT_SOCKET, timeout=1.0):
+    # None when no service answers on path
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            send_message(sock, {'op': 'stats'})
+            return recv_message(sock)[0]
+    except (OSError, ValueError):
+        return None
+
+def ensure_service(path=PREDICT_SOCKET, timeout=10):
+    # Starts the service unless one answers; a lock file makes sure only one process starts it.
+    # The child runs from the repository root so `-m ames.predict_service` resolves wherever the app was
+    # started; callers fall back to in-process models if it exits or is not up within timeout seconds
+    if service_stats(path):
+        return True
+    import fcntl
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if service_stats(path):
+            return True
+        with open(path + '.log', 'a') as log:
+            child = subprocess.Popen([sys.executable, '-m', 'ames.predict_service', '--socket', path],
+                                     stdout=log, stderr=log, cwd=ROOT_DIR, start_new_session=True)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and child.poll() is None:
+            if service_stats(path):
+                return True
+            time.sleep(0.1)
+        return service_stats(path) is not None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve batched model predictions to the app processes')
+    parser.add_argument('--socket', default=PREDICT_SOCKET or '/tmp/ames-predict.sock')
+    parser.add_argument('--preload', nargs='*', default=['CBR'], help='models to load at startup')
+    args = parser.parse_args(argv)
+    serve(args.socket, args.preload)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import itertools
+import numpy as np
+
+#=======================================================================================================
+# Renovation options offered on the "Renovation Model" page
+# A renovation vector is (baths, kitchen, bsmt, fin_bsmt, garage, pool, central_air, paved_drive)
+# where baths is the number of above-ground bathrooms added and the rest are 0/1 toggles
+RENO_BATHS = (0.0, 0.5, 1.0, 1.5, 2.0)
+RENO_TOGGLES = ('Kitchen', 'Bsmt', 'FinBsmt', 'Garage', 'Pool', 'CentralAir', 'PavedDrive')
+NO_RENO = (0.0,) + (0,)*len(RENO_TOGGLES)
+# Column names for renovation vectors stored in files (batch scoring input/output)
+RENO_COLUMNS = ('baths', 'kitchen', 'bsmt', 'fin_bsmt', 'garage', 'pool', 'central_air', 'paved_drive')
+RENO_LABELS = ('Kitchen', 'Basement', 'Finish Basement', 'Garage', 'Pool', 'Central Air', 'Paved Driveway')
+
+# Ordinal quality levels a house can be remodeled from (0 means the feature does not exist)
+QUAL_LEVELS = (1, 2, 3, 4)
+TOP_QUAL = 4
+
+def reno_vector(baths=0.0, kitchen=False, bsmt=False, fin_bsmt=False, garage=False,
+                pool=False, central_air=False, paved_drive=False):
+    # normalises page selections into the hashable vector used as a table key
+    return (float(baths),) + tuple(int(bool(t)) for t in
+        (kitchen, bsmt, fin_bsmt, garage, pool, central_air, paved_drive))
+
+def reno_label(vector):
+    # short description of a renovation vector, e.g. '1.5 Bathrooms + Kitchen + Pool'
+    parts = [f'{vector[0]:g} Bathroom' + ('s' if vector[0] != 1 else '')] if vector[0] else []
+    parts += [label for label, flag in zip(RENO_LABELS, vector[1:]) if flag]
+    return ' + '.join(parts) or 'No renovation'
+
+# Single renovations offered by the uplift map layer, as renovation vectors
+RENOVATIONS = {'Add Half Bathroom': reno_vector(baths=0.5),
+               'Add Bathroom': reno_vector(baths=1),
+               'Remodel Kitchen': reno_vector(kitchen=True),
+               'Remodel Basement': reno_vector(bsmt=True),
+               'Finish Basement': reno_vector(fin_bsmt=True),
+               'Remodel Garage': reno_vector(garage=True),
+               'Build Pool': reno_vector(pool=True),
+               'Install Central Air': reno_vector(central_air=True),
+               'Pave Driveway': reno_vector(paved_drive=True)}
+
+def reno_grid():
+    # every renovation vector the page can produce, ordered by reno_index
+    return list(itertools.product(RENO_BATHS, *[(0, 1)]*len(RENO_TOGGLES)))
+
+def reno_index(vector):
+    # position of a renovation vector in reno_grid()
+    idx = RENO_BATHS.index(float(vector[0]))
+    for flag in vector[1:]:
+        idx = idx*2 + int(bool(flag))
+    return idx
+
+# Model columns written by renovations
+QUAL_TARGETS = {'kitchen': 'KitchenQual', 'bsmt': 'BsmtCond', 'garage': 'GarageQual'}
+FLAG_TARGETS = {'pool': 'HasPool', 'central_air': 'CentralAir', 'paved_drive': 'PavedDrive'}
+RENO_TARGETS = ('AllBathAbv', 'GoodLivArea', 'BsmtUnfSF') + tuple(QUAL_TARGETS.values()) + tuple(FLAG_TARGETS.values())
+
+class RenoEncoder:
+    # Compiled feature schema: model columns at fixed positions in a float64 matrix
+    # Renovations are applied as vectorised updates on the matrix, never on DataFrames
+    def __init__(self, feature_names):
+        self.columns = list(feature_names)
+        self.pos = {col: i for i, col in enumerate(self.columns)}
+        missing = [col for col in RENO_TARGETS if col not in self.pos]
+        if missing:
+            raise ValueError(f'renovation targets are not model columns: {missing}')
+
+    def encode(self, houses):
+        # (M houses x F features) matrix in model column order; extra columns (SalePrice) are dropped
+        return houses[self.columns].to_numpy(dtype=np.float64)
+
+    def apply(self, X, vector):
+        # Returns a renovated copy of X
+        # Vector entries may be scalars (same renovation for every row) or per-row arrays
+        # Toggles that do not apply to a house (no basement, already has a pool...) leave it unchanged
+        baths, kitchen, bsmt, fin_bsmt, garage, pool, central_air, paved_drive = vector
+        flags = {'kitchen': kitchen, 'bsmt': bsmt, 'garage': garage,
+                 'pool': pool, 'central_air': central_air, 'paved_drive': paved_drive}
+        p = self.pos
+        base = X
+        X = X.copy()
+        X[:, p['AllBathAbv']] += np.asarray(baths, dtype=np.float64)
+        for name, col in QUAL_TARGETS.items():
+            remodel = np.asarray(flags[name], dtype=bool) & np.isin(base[:, p[col]], QUAL_LEVELS)
+            X[:, p[col]] = np.where(remodel, TOP_QUAL, base[:, p[col]])
+        fin = np.asarray(fin_bsmt, dtype=bool) & np.isin(base[:, p['BsmtCond']], QUAL_LEVELS)
+        X[:, p['GoodLivArea']] = np.where(fin, base[:, p['GoodLivArea']] + base[:, p['BsmtUnfSF']],
+                                          base[:, p['GoodLivArea']])
+        X[:, p['BsmtUnfSF']] = np.where(fin, 0, base[:, p['BsmtUnfSF']])
+        for name, col in FLAG_TARGETS.items():
+            X[:, p[col]] = np.where(np.asarray(flags[name], dtype=bool), 1, base[:, p[col]])
+        return X
+
+    def scenarios(self, X, vectors):
+        # N renovation vectors x M houses -> one (N*M x F) matrix, scenario-major
+        # rows [n*M:(n+1)*M] hold every house under vectors[n]
+        vectors = np.asarray(vectors, dtype=np.float64)
+        per_row = np.repeat(vectors, len(X), axis=0)
+        return self.apply(np.tile(X, (len(vectors), 1)), per_row.T)
+
+    def predict(self, model, X):
+        return np.floor(model.predict(X))
+
+def reno_encoder(model):
+    # the matrix is all float64, so the model must not use categorical features
+    if model.get_cat_feature_indices():
+        raise ValueError('RenoEncoder requires a model without categorical features')
+    return RenoEncoder(model.feature_names_)
@@ -0,0 +1,84 @@
+import argparse
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+from ames.config import asset_path
+from ames.houses import load_houses
+from ames.models import ModelRegistry
+from ames.reno import reno_grid, reno_index, reno_encoder
+
+#=======================================================================================================
+# Precomputed renovation price table
+# prices[i, j] is the model price of house pids[i] after renovation reno_grid()[j]
+# column 0 is the no-renovation vector, i.e. the baseline price
+# Prices are floored before they are stored: whole dollars below 2**24 are exact in float32, so the
+# table matches the live floor(predict) to the dollar (flooring after the float32 cast did not)
+TABLE_FILE = 'reno_table.npz'
+
+class RenoTable:
+    def __init__(self, pids, prices):
+        self.pids = pids
+        self.prices = prices
+        self._rows = {pid: row for row, pid in enumerate(pids.tolist())}
+
+    def __contains__(self, pid):
+        return int(pid) in self._rows
+
+    def rows(self, pids):
+        # row of each pid in the table, -1 for houses it does not hold
+        return np.array([self._rows.get(int(pid), -1) for pid in pids], dtype=np.int64)
+
+    def lookup(self, pid, vector):
+        # returns the precomputed (floored) price, or None when the house is not in the table
+        row = self._rows.get(int(pid))
+        if row is None:
+            return None
+        return float(np.floor(self.prices[row, reno_index(vector)]))
+
+    def save(self, path=None):
+        np.savez(path or asset_path(TABLE_FILE), pids=self.pids, prices=self.prices)
+
+def load_reno_table(path=None):
+    # returns None when the table has not been built so callers can fall back to live predictions
+    path = path or asset_path(TABLE_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as table:
+        return RenoTable(table['pids'], table['prices'])
+
+def build_reno_table(model, pkl_data, combos_per_batch=16):
+    # Scores every house against every renovation vector, several vectors per predict call
+    encoder = reno_encoder(model)
+    X = encoder.encode(pkl_data)
+    grid = reno_grid()
+    prices = np.empty((len(X), len(grid)), dtype=np.float32)
+    for start in range(0, len(grid), combos_per_batch):
+        batch = grid[start:start+combos_per_batch]
+        preds = model.predict(encoder.scenarios(X, batch)).reshape(len(batch), len(X))
+        prices[:, start:start+len(batch)] = np.floor(preds.T)
+    return RenoTable(pkl_data.index.values.astype(np.int64), prices)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the precomputed renovation price table')
+    parser.add_argument('--data', default=None, help='ordinal-encoded house data CSV (default: the canonical house table)')
+    parser.add_argument('--model', default=None, help='pickled model (default: the registry CatBoost model)')
+    parser.add_argument('--out', default=asset_path(TABLE_FILE))
+    args = parser.parse_args(argv)
+
+    if args.data:
+        pkl_data = pd.read_csv(args.data, index_col='PID')
+    else:
+        pkl_data = load_houses().view('pickle_data')
+    if args.model:
+        with open(args.model, 'rb') as f:
+            model = pickle.load(f)
+    else:
+        model = ModelRegistry().get('CBR')
+    table = build_reno_table(model, pkl_data)
+    table.save(args.out)
+    print(f'{len(table.pids)} houses x {table.prices.shape[1]} renovations -> {args.out}')
+
+if __name__ == '__main__':
+    main()
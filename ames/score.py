@@ -0,0 +1,138 @@
+import argparse
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ames.houses import load_houses
+from ames.models import ModelRegistry
+from ames.reno import RENO_COLUMNS, reno_encoder
+
+#=======================================================================================================
+# Headless batch scoring of renovation specs
+# Input file: a PID column plus any of RENO_COLUMNS (missing columns mean "no renovation")
+# Output: the input columns plus base_price, reno_price, uplift and uplift_pct
+#
+#   python -m ames.score contractor_list.csv scored.csv --workers 4
+
+def load_scoring_assets(data_path=None, model_path=None):
+    if data_path:
+        pkl_data = pd.read_csv(data_path, index_col='PID')
+    else:
+        pkl_data = load_houses().view('pickle_data')
+    if model_path:
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+    else:
+        model = ModelRegistry().get('CBR')
+    return model, pkl_data
+
+def normalise_specs(specs):
+    # fills in missing renovation columns and coerces yes/no style answers to 0/1
+    specs = specs.copy()
+    for col in RENO_COLUMNS:
+        if col not in specs:
+            specs[col] = 0.0 if col == 'baths' else 0
+        elif col == 'baths':
+            specs[col] = specs[col].fillna(0).astype(float)
+        else:
+            specs[col] = (specs[col].astype(str).str.strip().str.lower()
+                          .isin(['1', '1.0', 'y', 'yes', 'true'])).astype(int)
+    return specs
+
+def parse_pids(values):
+    # integer PIDs, <NA> where the input is blank, not a number or fractional
+    pids = pd.to_numeric(values.map(lambda v: v.strip() if isinstance(v, str) else v), errors='coerce')
+    return pids.where(pids == np.floor(pids)).astype('Int64')
+
+def score_specs(model, pkl_data, specs):
+    # One predict call for all base houses and one for all renovated houses in the chunk.
+    # Rows are scored on a parsed copy of the PIDs; the output keeps the input PID text, and rows whose
+    # PID does not parse are left unscored, like unknown PIDs
+    specs = normalise_specs(specs)
+    pids = parse_pids(specs['PID'])
+    known = pids.isin(pkl_data.index).to_numpy(dtype=bool)
+    encoder = reno_encoder(model)
+
+    base_price = np.full(len(specs), np.nan)
+    reno_price = np.full(len(specs), np.nan)
+    if known.any():
+        X = encoder.encode(pkl_data.loc[pids[known].to_numpy(dtype=np.int64)])
+        vector = tuple(specs.loc[known, col].values for col in RENO_COLUMNS)
+        preds = encoder.predict(model, np.vstack([X, encoder.apply(X, vector)]))
+        base_price[known] = preds[:known.sum()]
+        reno_price[known] = preds[known.sum():]
+
+    scored = specs.copy()
+    scored['base_price'] = base_price
+    scored['reno_price'] = reno_price
+    scored['uplift'] = reno_price - base_price
+    scored['uplift_pct'] = np.round(scored['uplift'] / base_price * 100, 2)
+    return scored
+
+#------------------------------------------------------------------------------------------------------
+# Process pool workers load the model and data once each
+_worker = {}
+
+def _init_worker(data_path, model_path):
+    _worker['model'], _worker['pkl_data'] = load_scoring_assets(data_path, model_path)
+
+def _score_chunk(specs):
+    return score_specs(_worker['model'], _worker['pkl_data'], specs)
+
+def read_specs(path, chunksize):
+    # yields DataFrame chunks from a CSV or Parquet file without reading it all at once
+    if path.endswith('.parquet') or path.endswith('.pq'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        # PIDs are read as text, so they are written back exactly as given
+        yield from pd.read_csv(path if path != '-' else sys.stdin, chunksize=chunksize, dtype={'PID': str})
+
+def score_file(in_path, out_path, chunksize=50000, workers=None, data_path=None, model_path=None):
+    # Streams scored chunks to out_path (CSV, or '-' for stdout) in input order
+    # At most 2*workers chunks are in flight, so memory stays bounded for any input size
+    workers = workers or os.cpu_count() or 1
+    out = sys.stdout if out_path == '-' else open(out_path, 'w', newline='')
+    n_rows = 0
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(data_path, model_path)) as pool:
+            pending = []
+            header = True
+            for chunk in read_specs(in_path, chunksize):
+                pending.append(pool.submit(_score_chunk, chunk))
+                if len(pending) >= 2*workers:
+                    scored = pending.pop(0).result()
+                    scored.to_csv(out, index=False, header=header)
+                    header = False
+                    n_rows += len(scored)
+            for future in pending:
+                scored = future.result()
+                scored.to_csv(out, index=False, header=header)
+                header = False
+                n_rows += len(scored)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return n_rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score renovation specs for a list of PIDs')
+    parser.add_argument('specs', help="CSV or Parquet file with a PID column and renovation columns ('-' for stdin)")
+    parser.add_argument('out', help="output CSV ('-' for stdout)")
+    parser.add_argument('--chunksize', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--data', default=None, help='ordinal-encoded house data CSV (default: the canonical house table)')
+    parser.add_argument('--model', default=None, help='pickled model (default: the registry CatBoost model)')
+    args = parser.parse_args(argv)
+
+    n_rows = score_file(args.specs, args.out, args.chunksize, args.workers, args.data, args.model)
+    print(f'scored {n_rows} rows', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+#=======================================================================================================
+# Spatial index over the canonical house table
+# A KD-tree over the web-mercator coordinates answers nearest-house queries in O(log n), and
+# (Sector, Neighborhood) -> row positions replaces boolean scans of map_data on every rerun.
+# Positions index every view of the HouseTable, since all views share the canonical row order.
+COMPARABLE_COLUMNS = ['Prop_Addr', 'SalePrice', 'GoodLivArea', 'YearBuilt', 'Distance (m)']
+
+class SpatialIndex:
+    def __init__(self, houses):
+        self.pids = houses.index.values
+        self._pos = {pid: i for i, pid in enumerate(self.pids.tolist())}
+        self.tree = cKDTree(houses[['x_merc', 'y_merc']].to_numpy(dtype=np.float64))
+        # mercator units are stretched by 1/cos(latitude); Ames is small enough for one factor
+        self.meters = np.cos(np.radians(np.median(houses['latitude'])))
+        self.subclass = np.asarray(houses['MSSubClass'])
+        self.size = houses['GoodLivArea'].to_numpy(dtype=np.float64)
+        self.year = houses['YearBuilt'].to_numpy(dtype=np.float64)
+        self.areas = {key: np.asarray(pos) for key, pos in
+                      houses.groupby(['Sector', 'Neighborhood'], observed=True).indices.items()}
+        self.sectors = {}
+        for sector, neighborhood in sorted(self.areas, key=lambda key: self.areas[key][0]):
+            self.sectors.setdefault(sector, []).append(neighborhood)
+
+    def neighborhoods(self, sector):
+        # neighborhoods of a sector, in order of first appearance like Series.unique()
+        return self.sectors.get(sector, [])
+
+    def area(self, sector, neighborhood):
+        # row positions of the houses in one neighborhood of a sector
+        return self.areas.get((sector, neighborhood), np.empty(0, dtype=np.int64))
+
+    def comparables(self, pid, k=5, size_band=0.25):
+        # Row positions and distances (m) of the k nearest houses of the same type (MSSubClass)
+        # within +-size_band of its living area, ranked by distance plus feature dissimilarity
+        i = self._pos[int(pid)]
+        n = len(self.pids)
+        query = min(n, 8*k + 1)
+        while True:
+            dist, pos = self.tree.query(self.tree.data[i], k=query)
+            pos, dist = np.atleast_1d(pos), np.atleast_1d(dist) * self.meters
+            keep = ((pos != i) & (self.subclass[pos] == self.subclass[i]) &
+                    (np.abs(self.size[pos] - self.size[i]) <= size_band * self.size[i]))
+            if keep.sum() >= k or query == n:
+                break
+            query = min(n, 4*query)
+        pos, dist = pos[keep], dist[keep]
+        if not len(pos):
+            return pos, dist
+        # each term is scaled to ~1 for a typical candidate: distance relative to the farthest
+        # candidate, size relative to the band, age relative to a generation
+        score = (dist / max(dist.max(), 1.0) +
+                 np.abs(self.size[pos] - self.size[i]) / (size_band * self.size[i]) +
+                 np.abs(self.year[pos] - self.year[i]) / 30)
+        best = np.argsort(score, kind='stable')[:k]
+        return pos[best], dist[best]
+
+def comparable_sales(index, houses, pid, k=5, size_band=0.25):
+    # the comparables as a table for display, nearest-and-most-similar first
+    pos, dist = index.comparables(pid, k, size_band)
+    comps = houses.iloc[pos][['Prop_Addr', 'SalePrice', 'GoodLivArea', 'YearBuilt']]
+    return comps.assign(**{'Distance (m)': np.round(dist)})[COMPARABLE_COLUMNS]
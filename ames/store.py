@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+from ames.config import asset_path
+
+try:
+    from pandas.core.internals.api import make_block
+except ImportError:  # pandas < 1.3
+    from pandas.core.internals import make_block
+from pandas.core.internals import BlockManager
+
+#=======================================================================================================
+# Binary, memory-mapped asset store
+# Each dataset is a directory of .npy files plus a meta.json describing the columns:
+#
+#   assets/store/houses/meta.json
+#   assets/store/houses/index.npy         PID index
+#   assets/store/houses/float64.npy       all float64 columns, one row per column
+#   assets/store/houses/int64.npy         all int64 columns
+#   assets/store/houses/cat_003.npy ...   codes of each string column (categories in meta.json)
+#
+# Files are opened with np.load(mmap_mode='r') and handed to pandas as its internal blocks, so the
+# loaded frame is a view of the maps: nothing is parsed or copied at load time and every process
+# shares the same OS pages. Loaded frames are read-only: copy before mutating.
+STORE_DIR = 'store'
+
+def store_path(name):
+    return asset_path(os.path.join(STORE_DIR, name))
+
+def write_table(data, path):
+    # Writes a PID-indexed DataFrame as one 2-D .npy per numeric dtype plus one file per string column
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'index.npy'), data.index.values)
+    groups = {}
+    categories = []
+    for pos, col in enumerate(data.columns):
+        values = data[col]
+        if values.dtype == object or pd.api.types.is_categorical_dtype(values):
+            cat = pd.Categorical(values)
+            file = f'cat_{pos:03d}.npy'
+            np.save(os.path.join(path, file), cat.codes)
+            categories.append({'position': pos, 'file': file, 'categories': [str(c) for c in cat.categories]})
+        else:
+            groups.setdefault(str(values.dtype), []).append(pos)
+    blocks = []
+    for dtype, positions in groups.items():
+        file = f'{dtype}.npy'
+        np.save(os.path.join(path, file), np.ascontiguousarray(data.iloc[:, positions].values.T))
+        blocks.append({'dtype': dtype, 'file': file, 'positions': positions})
+    meta = {'index': data.index.name, 'rows': len(data), 'columns': [str(c) for c in data.columns],
+            'blocks': blocks, 'categorical': categories}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=1)
+
+def read_table(path):
+    # Builds a DataFrame whose blocks are the memory-mapped arrays, in the original column order
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    def load(file):
+        return np.asarray(np.load(os.path.join(path, file), mmap_mode='r'))
+
+    index = pd.Index(load('index.npy'), name=meta['index'])
+    blocks = [make_block(load(b['file']), placement=b['positions'], ndim=2) for b in meta['blocks']]
+    for c in meta['categorical']:
+        values = pd.Categorical.from_codes(load(c['file']), categories=c['categories'])
+        blocks.append(make_block(values, placement=[c['position']], ndim=2))
+    mgr = BlockManager(blocks, [pd.Index(meta['columns']), index])
+    return pd.DataFrame(mgr)
+
+def publish_table(path, build):
+    # Attaches to the table at path, building and writing it first if no process has yet.
+    # Writers race on an atomic rename of their own temporary directory, so readers never see a
+    # half-written table and concurrent first loads cost a duplicate build at worst.
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        tmp = f'{path}.tmp{os.getpid()}'
+        write_table(build(), tmp)
+        try:
+            os.rename(tmp, path)
+        except OSError:  # another process published first
+            shutil.rmtree(tmp, ignore_errors=True)
+    return read_table(path)
+
+def decode_categories(data):
+    # plain object columns for consumers that do not understand pandas categoricals
+    cats = [col for col in data.columns if pd.api.types.is_categorical_dtype(data[col])]
+    if not cats:
+        return data
+    return data.assign(**{col: np.asarray(data[col]) for col in cats})
@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import sys
+import urllib.request
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from ames.config import TILE_DIR, TILE_URL
+from ames.utils import to_mercator
+
+#=======================================================================================================
+# Offline map tiles
+# Ames-extent basemap tiles are pre-fetched into assets/tiles/{z}/{x}/{y}.png with an index.json
+# recording the source, zoom levels and tile ranges. A small tile server serves them locally, and
+# the maps use it when AMES_TILE_URL points at it (e.g. http://localhost:8765/{z}/{x}/{y}.png):
+#
+#   python -m ames.tiles fetch                 # once, with network access
+#   python -m ames.tiles serve --port 8765     # next to the app
+#
+# Missing tiles are fetched from the upstream CDN and cached when it is reachable (--upstream),
+# otherwise a transparent tile is served so the map renders without holes of broken images.
+UPSTREAM_URL = 'https://tiles.basemaps.cartocdn.com/light_all/{z}/{x}/{y}@2x.png'
+ATTRIBUTION = ('&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors,'
+               '&copy; <a href="https://cartodb.com/attributions">CartoDB</a>')
+INDEX_FILE = 'index.json'
+ZOOMS = tuple(range(10, 17))
+# Mercator bounds of the map views in ames.ui.maps.bok_fig
+AMES_CENTER = to_mercator(42.034534, -93.620369)
+AMES_EXTENT = (AMES_CENTER[0]-8000, AMES_CENTER[1]-8000, AMES_CENTER[0]+3000, AMES_CENTER[1]+5000)
+
+# smallest valid PNG: 1x1 transparent pixel
+BLANK_TILE = bytes.fromhex('89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+                           '1f15c4890000000b49444154789c6360000200000500017a5eab3f'
+                           '0000000049454e44ae426082')
+HALF_WORLD = 20037508.342789244
+
+def tile_range(extent, zoom):
+    # (xmin, xmax, ymin, ymax) of the tiles covering a mercator extent at one zoom level
+    x0, y0, x1, y1 = extent
+    n = 2 ** zoom
+    def tx(x):
+        return int((x + HALF_WORLD) / (2 * HALF_WORLD) * n)
+    def ty(y):
+        return int((HALF_WORLD - y) / (2 * HALF_WORLD) * n)
+    return tx(x0), tx(x1), ty(y1), ty(y0)
+
+def tile_path(z, x, y, tile_dir=TILE_DIR):
+    return os.path.join(tile_dir, str(z), str(x), f'{y}.png')
+
+def read_index(tile_dir=TILE_DIR):
+    path = os.path.join(tile_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def download(url, path, timeout=10):
+    request = urllib.request.Request(url, headers={'User-Agent': 'ames-housing-app'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = response.read()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+    return data
+
+def fetch_tiles(zooms=ZOOMS, extent=AMES_EXTENT, upstream=UPSTREAM_URL, tile_dir=TILE_DIR):
+    # downloads every tile of the extent that is not cached yet, then writes the index
+    ranges = {}
+    missing = []
+    fetched = 0
+    for z in zooms:
+        xmin, xmax, ymin, ymax = ranges[str(z)] = tile_range(extent, z)
+        for x in range(xmin, xmax + 1):
+            for y in range(ymin, ymax + 1):
+                path = tile_path(z, x, y, tile_dir)
+                if os.path.exists(path):
+                    continue
+                try:
+                    download(upstream.format(z=z, x=x, y=y), path)
+                    fetched += 1
+                except OSError as e:
+                    missing.append([z, x, y])
+                    print(f'{z}/{x}/{y}: {e}', file=sys.stderr)
+    index = {'upstream': upstream, 'extent': list(extent), 'zooms': ranges, 'missing': missing}
+    os.makedirs(tile_dir, exist_ok=True)
+    with open(os.path.join(tile_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=1)
+    return fetched, missing
+
+#------------------------------------------------------------------------------------------------------
+# Local tile server
+class TileHandler(SimpleHTTPRequestHandler):
+    # serves /{z}/{x}/{y}.png from the cache, /index.json for health checks
+    upstream = None
+
+    def do_GET(self):
+        parts = self.path.split('?')[0].strip('/').split('/')
+        if parts == [INDEX_FILE]:
+            return super().do_GET()
+        try:
+            z, x, y = int(parts[0]), int(parts[1]), int(parts[2].split('.')[0].split('@')[0])
+        except (IndexError, ValueError):
+            return self.send_error(404)
+        path = tile_path(z, x, y, self.directory)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return self.send_tile(f.read(), 'public, max-age=604800')
+        if self.upstream:
+            try:
+                return self.send_tile(download(self.upstream.format(z=z, x=x, y=y), path), 'public, max-age=604800')
+            except OSError:
+                pass
+        self.send_tile(BLANK_TILE, 'no-cache')
+
+    def send_tile(self, data, cache_control):
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port=8765, host='127.0.0.1', tile_dir=TILE_DIR, upstream=None):
+    handler = type('Handler', (TileHandler,), {'upstream': upstream})
+    server = ThreadingHTTPServer((host, port), partial(handler, directory=tile_dir))
+    print(f'serving {tile_dir} on http://{host}:{port}/{{z}}/{{x}}/{{y}}.png', file=sys.stderr)
+    server.serve_forever()
+
+#------------------------------------------------------------------------------------------------------
+# Tile source for the bokeh maps
+_local_ok = {}
+
+def local_tiles_available(url=TILE_URL, timeout=0.5):
+    # the local endpoint is checked once per process; a dead endpoint falls back to the CDN
+    if url not in _local_ok:
+        root = url.split('{z}')[0]
+        try:
+            with urllib.request.urlopen(root + INDEX_FILE, timeout=timeout):
+                _local_ok[url] = True
+        except (OSError, ValueError):
+            _local_ok[url] = False
+    return _local_ok[url]
+
+def tile_url():
+    # the configured local endpoint when it answers, the CDN otherwise
+    if TILE_URL and local_tiles_available(TILE_URL):
+        return TILE_URL
+    return UPSTREAM_URL
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pre-fetch and serve Ames map tiles')
+    sub = parser.add_subparsers(dest='command', required=True)
+    fetch = sub.add_parser('fetch', help='download the Ames-extent tiles into the cache')
+    fetch.add_argument('--zoom', type=int, nargs=2, default=(ZOOMS[0], ZOOMS[-1]), metavar=('MIN', 'MAX'))
+    fetch.add_argument('--upstream', default=UPSTREAM_URL)
+    server = sub.add_parser('serve', help='serve the cached tiles')
+    server.add_argument('--port', type=int, default=8765)
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--upstream', nargs='?', const=UPSTREAM_URL, default=None,
+                        help='fetch and cache tiles missing from the cache (default: serve a blank tile)')
+    for p in (fetch, server):
+        p.add_argument('--dir', default=TILE_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == 'fetch':
+        fetched, missing = fetch_tiles(range(args.zoom[0], args.zoom[1] + 1), upstream=args.upstream, tile_dir=args.dir)
+        print(f'{fetched} tiles fetched, {len(missing)} failed -> {args.dir}')
+    else:
+        serve(args.port, args.host, args.dir, args.upstream)
+
+if __name__ == '__main__':
+    main()
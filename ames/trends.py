@@ -0,0 +1,43 @@
+import numpy as np
+from scipy import stats
+
+#=======================================================================================================
+# Precomputed trend lines of the "House Features" page
+# SalePrice ~ GoodLivArea is fitted by closed-form OLS once per category of each selectable feature,
+# with the confidence band of the fitted mean, instead of statsmodels refitting on every rerun.
+FEATURES = ('KitchenQual', 'BsmtCond', 'GarageQual', 'PavedDrive', 'CentralAir', 'HeatingQC')
+
+def ols_fit(x, y, level=0.95, points=50):
+    # line and confidence band of the mean on an evenly spaced grid over the range of x
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    xbar, ybar = x.mean(), y.mean()
+    sxx = ((x - xbar)**2).sum()
+    slope = ((x - xbar) * (y - ybar)).sum() / sxx if sxx else 0.0
+    intercept = ybar - slope * xbar
+    sse = ((y - intercept - slope * x)**2).sum()
+    sst = ((y - ybar)**2).sum()
+    grid = np.linspace(x.min(), x.max(), points)
+    fit = intercept + slope * grid
+    if n > 2 and sxx:
+        half = stats.t.ppf((1 + level) / 2, n - 2) * np.sqrt(sse / (n - 2) * (1/n + (grid - xbar)**2 / sxx))
+    else:
+        half = np.full(points, np.nan)
+    return {'n': n, 'slope': slope, 'intercept': intercept, 'r2': 1 - sse/sst if sst else np.nan,
+            'x': grid, 'fit': fit, 'lower': fit - half, 'upper': fit + half}
+
+def feature_fits(data, feature, categories, level=0.95):
+    # one fit per category of a feature, in display order; empty categories are skipped
+    fits = {}
+    for category in categories:
+        rows = data[feature] == category
+        if rows.sum() >= 2:
+            fits[category] = ols_fit(data.loc[rows, 'GoodLivArea'], data.loc[rows, 'SalePrice'], level)
+    return fits
+
+def downsample(n, limit, seed=0):
+    # sorted positions of at most limit of n rows, the same ones on every call
+    if n <= limit:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, limit, replace=False))
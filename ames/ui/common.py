@@ -0,0 +1,275 @@
+import functools
+import importlib
+import threading
+import time
+import traceback
+import streamlit as st
+
+from ames.cache import CachedPredictor
+from ames.config import PREDICTION_CACHE_SIZE, PREWARM, RELOAD_INTERVAL
+from ames.explain import SHAP_FILE, ExplanationCache, load_explanations
+from ames.houses import current_version, load_houses, release_file
+from ames.instrument import phase
+from ames.intervals import IntervalPredictor
+from ames.models import ModelRegistry, release_specs
+from ames.optimizer import RankingCache
+from ames.reno import reno_encoder
+from ames.reno_table import TABLE_FILE, load_reno_table
+from ames.spatial import SpatialIndex
+
+#=======================================================================================================
+# Process-wide data and model loaders
+# Each loader runs once per process and data release and shares the result across
+# sessions and reruns, so pages only pay for what they use the first time they need it
+# All datasets are views of the canonical house table (python -m ames.houses), shared read-only
+#
+# Loaders are keyed by the data release (ames.ingest). When a new release is published, the first
+# rerun after RELOAD_INTERVAL starts one background thread that loads and warms it; reruns keep
+# using the old release until it is ready, then all switch to it without a restart.
+# Only the active release and the one loading are kept; the others are dropped after the switch.
+_release = {'active': None, 'loading': None, 'checked': 0.0}
+_release_lock = threading.Lock()
+_releases = {}  # version -> Release
+
+class Release:
+    # everything loaded from one data release, each item built once on first use
+    def __init__(self, version):
+        self.version = version
+        self._items = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        if key not in self._items:
+            with self._lock:
+                lock = self._locks.setdefault(key, threading.Lock())
+            with lock:
+                if key not in self._items:
+                    self._items[key] = build()
+        return self._items[key]
+
+    def close(self):
+        # stops the background workers (IntervalPredictor); reruns still holding the objects finish normally
+        for item in list(self._items.values()):
+            if hasattr(item, 'shutdown'):
+                item.shutdown()
+
+def release(version):
+    # a version dropped meanwhile (a rerun that read it just before the switch) gets the active release
+    with _release_lock:
+        if version not in _releases and version not in (_release['active'], _release['loading']):
+            version = _release['active']
+        if version not in _releases:
+            _releases[version] = Release(version)
+        return _releases[version]
+
+def per_release(loader):
+    # like st.experimental_singleton, but the results live and die with the release of the first argument;
+    # loaders should read their data through the release_* loaders of that version
+    key = (loader.__module__, loader.__qualname__)
+    @functools.wraps(loader)
+    def load(version, *args):
+        return release(version).get((*key, *args), lambda: loader(version, *args))
+    return load
+
+def data_version():
+    # the release reruns read from
+    now = time.monotonic()
+    with _release_lock:
+        if _release['active'] is None:
+            _release['active'] = current_version()
+            _release['checked'] = now
+        elif RELOAD_INTERVAL and now - _release['checked'] >= RELOAD_INTERVAL:
+            _release['checked'] = now
+            latest = current_version()
+            if latest not in (_release['active'], _release['loading']):
+                _release['loading'] = latest
+                threading.Thread(target=activate_release, args=(latest,), name=f'load-{latest}', daemon=True).start()
+        return _release['active']
+
+def activate_release(version):
+    # loads everything a rerun needs from the release, renders the cached figures, then switches
+    try:
+        table = release_houses(version)
+        release_medians(version)
+        release_spatial_index(version)
+        release_reno_table(version)
+        release_explanations(version)
+        release_predictor(version)
+        sectors = importlib.import_module('ames.ui.sectors_page')
+        features = importlib.import_module('ames.ui.features_page')
+        sector_key = sectors.prewarm(table.view('map_data'), release_sector_counts(version))
+        feature_key = features.prewarm(table.view('page_3_data'))
+    except Exception:
+        traceback.print_exc()  # keep serving the current release, retry on the next check
+        with _release_lock:
+            _release['loading'] = None
+            failed = _releases.pop(version, None)
+        if failed is not None:
+            failed.close()
+        return
+    with _release_lock:
+        _release['active'] = version
+        _release['loading'] = None
+        retired = [_releases.pop(old) for old in list(_releases) if old != version]
+    for old in retired:
+        old.close()
+    sectors.forget_figures(sector_key)
+    features.forget_figures(feature_key)
+
+@per_release
+def release_houses(version):
+    with phase('load houses'):
+        return load_houses(version)
+
+@per_release
+def release_registry(version):
+    # models are loaded on first use, see ames.models; a release may carry a refreshed model
+    return ModelRegistry(release_specs(release_houses(version).path))
+
+@per_release
+def release_encoder(version):
+    return reno_encoder(release_registry(version).get('CBR'))
+
+@per_release
+def release_predictor(version):
+    # LRU prediction cache shared by every session in the process
+    return CachedPredictor(release_registry(version).get('CBR'), release_encoder(version), maxsize=PREDICTION_CACHE_SIZE)
+
+@per_release
+def release_intervals(version):
+    # prediction intervals computed on background threads, cached per (PID, renovation)
+    return IntervalPredictor(release_registry(version).get('CBR'), release_encoder(version))
+
+@per_release
+def release_explanations(version):
+    # SHAP values of every base house, see ames.explain
+    table = release_houses(version)
+    with phase('load shap table'):
+        return load_explanations(release_registry(version).get('CBR'), release_file(table.path, SHAP_FILE),
+                                 table.view('pickle_data'))
+
+@per_release
+def release_explainer(version):
+    # renovated-house SHAP values, cached per (PID, renovation) for every session in the process
+    return ExplanationCache(release_registry(version).get('CBR'), release_encoder(version))
+
+@per_release
+def release_spatial_index(version):
+    # KD-tree and (Sector, Neighborhood) index over the house table
+    houses = release_houses(version).houses
+    with phase('spatial index'):
+        return SpatialIndex(houses)
+
+@per_release
+def release_medians(version):
+    with phase('medians'):
+        return release_houses(version).medians()
+
+@per_release
+def release_sector_counts(version):
+    return release_houses(version).derived('sector_counts')
+
+@per_release
+def release_reno_table(version):
+    # Precomputed (PID, renovation) prices built by `python -m ames.reno_table` or stored with the release
+    with phase('load reno table'):
+        return load_reno_table(release_file(release_houses(version).path, TABLE_FILE))
+
+@per_release
+def release_rankings(version):
+    # neighborhood renovation rankings, priced from the renovation table where it has the houses
+    return RankingCache(release_registry(version).get('CBR'), release_encoder(version), release_houses(version),
+                        release_reno_table(version))
+
+# The loaders pages use, for the active release
+def load_house_table():
+    return release_houses(data_version())
+
+def load_data(what_data):
+    # 'map_data', 'house_data', 'page_3_data' or 'pickle_data', built on first use
+    return load_house_table().view(what_data)
+
+def load_registry():
+    return release_registry(data_version())
+
+def load_model():
+    return load_registry().get('CBR')
+
+def load_encoder():
+    return release_encoder(data_version())
+
+def load_predictor():
+    return release_predictor(data_version())
+
+def load_intervals():
+    return release_intervals(data_version())
+
+def load_base_explanations():
+    return release_explanations(data_version())
+
+def load_explainer():
+    return release_explainer(data_version())
+
+def load_spatial_index():
+    return release_spatial_index(data_version())
+
+def load_medians():
+    return release_medians(data_version())
+
+def load_sector_counts():
+    return release_sector_counts(data_version())
+
+def load_reno_lookup():
+    return release_reno_table(data_version())
+
+def load_rankings():
+    return release_rankings(data_version())
+
+@st.experimental_singleton
+def start_prewarm():
+    # Renders the cached page figures in a background thread, once per process
+    if not PREWARM:
+        return None
+    map_data = load_data('map_data')
+    sector_counts = load_sector_counts()
+    page_3_data = load_data('page_3_data')
+    def prewarm():
+        importlib.import_module('ames.ui.sectors_page').prewarm(map_data, sector_counts)
+        importlib.import_module('ames.ui.features_page').prewarm(page_3_data)
+    thread = threading.Thread(target=prewarm, name='prewarm-figures', daemon=True)
+    thread.start()
+    return thread
+
+#=======================================================================================================
+# Shared lookups
+neib_fullname = {'Blmngtn':'Bloomington Heights',
+       'Blueste':'Bluestem',
+       'BrDale':'Briardale',
+       'BrkSide':'Brookside',
+       'ClearCr':'Clear Creek',
+       'CollgCr':'College Creek',
+       'Crawfor':'Crawford',
+       'Edwards':'Edwards',
+       'Gilbert':'Gilbert',
+       'IDOTRR':'Iowa DOT and Rail Road',
+       'MeadowV':'Meadow Village',
+       'Mitchel':'Mitchell',
+       'NAmes':'North Ames',
+       'NoRidge':'Northridge',
+       'NPkVill':'Northpark Villa',
+       'NridgHt':'Northridge Heights',
+       'NWAmes':'Northwest Ames',
+       'OldTown':'Old Town',
+       'SWISU':'South West of ISU',
+       'Sawyer':'Sawyer',
+       'SawyerW':'Sawyer West',
+       'Somerst':'Somerset',
+       'StoneBr':'Stone Brook',
+       'Timber':'Timberland',
+       'Veenker':'Veenker',
+       'Greens':'Greensboro',
+       'GrnHill':'Greens Hills',
+       'Landmrk':'Landmark Villas'}
+
+sec_mapper = {'Downtown':'DT','South':'SO','West':'WE','South East':'SE','North':'NO','North West':'NW'}
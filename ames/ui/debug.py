@@ -0,0 +1,29 @@
+import pandas as pd
+import streamlit as st
+
+from ames.ui.common import data_version, load_predictor, load_registry
+
+#------------------------------------------------------------------------------------------------------
+# Sidebar debug panel
+def render_debug(record=None, timer=None):
+    with st.sidebar.expander('Debug', expanded=True):
+        if record:
+            st.markdown(f"**This rerun**: {record['total_ms']:.0f} ms, RSS {record['rss_mb']:.0f} MB "
+                        f"({record['rss_delta_mb']:+.1f})")
+            if record['phases']:
+                phases = pd.DataFrame(record['phases']).set_index('phase')
+                st.dataframe(phases.style.format({'ms': '{:.1f}', 'rss_delta_mb': '{:+.1f}'}))
+        if timer is not None and timer.profile_path:
+            st.markdown(f"**Profile** saved to `{timer.profile_path}`")
+            st.text(timer.profile_text)
+        st.markdown(f'**Data release**: `{data_version()}`')
+        stats = load_predictor().stats()
+        st.markdown('**Prediction cache**')
+        st.write(f"entries: {stats['size']} / {stats['maxsize']}")
+        st.write(f"hits: {stats['hits']}  misses: {stats['misses']}  evictions: {stats['evictions']}")
+        st.write(f"hit rate: {100*stats['hit_rate']:.1f}%")
+        st.write(f"predict calls: {stats['predict_calls']}  mean latency: {stats['mean_predict_ms']:.1f} ms")
+        st.markdown('**Models**')
+        for name, info in load_registry().info().items():
+            st.write(f"{name} ({info['file']}): load {info['load_ms']:.0f} ms, "
+                     f"warm-up {info['warmup_ms']:.1f} ms, +{info['memory_mb']:.0f} MB")
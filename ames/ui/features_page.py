@@ -0,0 +1,94 @@
+import threading
+import numpy as np
+import streamlit as st
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from ames.config import SCATTER_POINT_LIMIT
+from ames.instrument import phase
+from ames.trends import FEATURES, downsample, feature_fits
+from ames.ui.common import data_version, per_release, release_houses
+from ames.utils import content_hash
+
+#------------------------------------------------------------------------------------------------------
+# Page 3 Feature Plots
+# One WebGL scatter facet per category with its precomputed OLS line and 95% confidence band.
+# Figures are built once per (feature, content hash) and shared by every session.
+category_orders = {'KitchenQual': ['Fair','Typical', 'Good','Excellent'],
+                   'HeatingQC': ['Fair','Typical', 'Good','Excellent'],
+                   'GarageQual': ['No Garage', 'Fair', 'Typical', 'Good'],
+                   'BsmtCond': ['No Basement', 'Fair', 'Typical', 'Good'],
+                   'PavedDrive': ['N', 'Y'],
+                   'CentralAir': ['N', 'Y']}
+_figures = {}
+_figure_lock = threading.Lock()
+
+def data_hash(page_3_data):
+    return content_hash(page_3_data[['GoodLivArea', 'SalePrice', *FEATURES]])
+
+def feature_figure(page_3_data, pick, limit=SCATTER_POINT_LIMIT):
+    fits = feature_fits(page_3_data, pick, category_orders[pick])
+    colors = px.colors.qualitative.Plotly
+    fig = make_subplots(rows=1, cols=len(fits), shared_yaxes=True, horizontal_spacing=0.02,
+                        subplot_titles=[f'{pick}={category}' for category in fits])
+    for col, (category, fit) in enumerate(fits.items(), start=1):
+        color = colors[(col-1) % len(colors)]
+        rows = page_3_data.loc[page_3_data[pick] == category, ['GoodLivArea', 'SalePrice']]
+        rows = rows.iloc[downsample(len(rows), limit)]
+        fig.add_trace(go.Scattergl(x=rows['GoodLivArea'].values, y=rows['SalePrice'].values, mode='markers',
+                                   marker=dict(color=color), name=str(category), legendgroup=str(category),
+                                   hovertemplate='GoodLivArea=%{x}<br>SalePrice=%{y}<extra></extra>'), row=1, col=col)
+        fig.add_trace(go.Scatter(x=np.concatenate([fit['x'], fit['x'][::-1]]),
+                                 y=np.concatenate([fit['upper'], fit['lower'][::-1]]),
+                                 fill='toself', fillcolor=color, opacity=0.2, line=dict(width=0),
+                                 hoverinfo='skip', showlegend=False, legendgroup=str(category)), row=1, col=col)
+        fig.add_trace(go.Scatter(x=fit['x'], y=fit['fit'], mode='lines', line=dict(color=color),
+                                 showlegend=False, legendgroup=str(category),
+                                 hovertemplate=(f"<b>OLS trendline</b><br>SalePrice = {fit['slope']:.2f} * GoodLivArea "
+                                                f"+ {fit['intercept']:,.0f}<br>R<sup>2</sup>={fit['r2']:.3f}, "
+                                                f"n={fit['n']}<extra></extra>")), row=1, col=col)
+        fig.update_xaxes(title_text='GoodLivArea', row=1, col=col)
+    fig.update_yaxes(title_text='SalePrice', row=1, col=1)
+    fig.update_layout(width=900, height=500, title='Sale Price vs. GoodLivArea by ' + pick, legend_title_text=pick)
+    return fig
+
+def cached_figure(page_3_data, pick, key=None):
+    key = (pick, key or data_hash(page_3_data))
+    if key not in _figures:
+        with _figure_lock:
+            if key not in _figures:
+                _figures[key] = feature_figure(page_3_data, pick)
+    return _figures[key]
+
+def prewarm(page_3_data):
+    key = data_hash(page_3_data)
+    for pick in FEATURES:
+        cached_figure(page_3_data, pick, key)
+    return key
+
+def forget_figures(keep):
+    # drops the figures of other data, once the release with hash keep is active
+    with _figure_lock:
+        for key in [key for key in _figures if key[1] != keep]:
+            del _figures[key]
+
+@per_release
+def load_data_hash(version):
+    # one hash per data release (see ames.ui.common.data_version)
+    return data_hash(release_houses(version).view('page_3_data'))
+
+def render(model_sec, model_neib):
+    st.title('Feature selection')
+
+    data_load_state = st.text('Loading data...')
+    version = data_version()  # the data and its hash come from the same release
+    page_3_data = release_houses(version).view('page_3_data')
+    pick = st.selectbox(
+         'Select a feature:',
+         FEATURES)
+
+    with phase('plotly figure'):
+        fig = cached_figure(page_3_data, pick, load_data_hash(version))
+    with phase('plotly serialise'):
+        st.plotly_chart(fig)
@@ -0,0 +1,141 @@
+import numpy as np
+import streamlit as st
+from bokeh.models import ColumnDataSource, HoverTool, ColorBar
+from bokeh.palettes import Spectral11
+from bokeh.transform import linear_cmap
+
+from ames.config import asset_path
+from ames.instrument import phase
+from ames.optimizer import uplift
+from ames.reno import RENOVATIONS
+from ames.ui.common import data_version, per_release, release_encoder, release_houses, release_registry
+from ames.ui.maps import bok_fig, map_layer, marks, uplift_layer
+
+#------------------------------------------------------------------------------------------------------
+# Page1: Map of Ames, IA
+COLOR_BARS = {'SalePrice': 'Price $(thousands)', 'Uplift': 'Uplift $', 'UpliftPct': 'Uplift %'}
+POINT_TOOLTIPS = {'SalePrice': [('Price', '@SalePrice')],
+                  'Uplift': [('Uplift', '$@Uplift{0,0}'), ('Uplift %', '@UpliftPct{0.0}%')],
+                  'UpliftPct': [('Uplift', '$@Uplift{0,0}'), ('Uplift %', '@UpliftPct{0.0}%')]}
+HEX_TOOLTIPS = {'SalePrice': [('Mean price', '@SalePrice')],
+                'Uplift': [('Mean uplift', '$@Uplift{0,0}')],
+                'UpliftPct': [('Mean uplift %', '@UpliftPct{0.0}%')]}
+
+@per_release
+def load_map_layer(version, map_choice):
+    # the columns of each map choice are extracted (or aggregated) once per data release
+    return map_layer(release_houses(version).view('map_data'), map_choice)
+
+@per_release
+def load_uplift(version, renovation):
+    # every house scored with and without one renovation in a single predict call, once per renovation
+    encoder = release_encoder(version)
+    with phase('predict uplift'):
+        return uplift(release_registry(version).get('CBR'), encoder,
+                      encoder.encode(release_houses(version).view('pickle_data')), RENOVATIONS[renovation])
+
+@per_release
+def load_uplift_layer(version, renovation, sector, field):
+    # (layer, summary) for the whole city or one sector; colours span the houses shown
+    map_data = release_houses(version).view('map_data')
+    result = load_uplift(version, renovation)
+    if sector:
+        rows = (map_data['Sector'] == sector).values
+        map_data = map_data[rows]
+        result = {key: values[rows] for key, values in result.items()}
+    applies = result['applies']
+    summary = {'houses': int(applies.sum()),
+               'median': np.median(result['uplift'][applies]) if applies.any() else 0.0,
+               'median_pct': np.median(result['uplift_pct'][applies]) if applies.any() else 0.0}
+    return uplift_layer(map_data, result, field), summary
+
+def bok_layer(layer, fig=None):
+    fig = fig or bok_fig()
+    # Set color palette and hover tool
+    field = layer['field']
+    mycolors = linear_cmap(field_name=field, palette=Spectral11, low=layer['low'], high=layer['high'])
+    if field in COLOR_BARS:
+        color_bar = ColorBar(color_mapper=mycolors['transform'], width=8,  location=(0,0),title=COLOR_BARS[field])
+        fig.add_layout(color_bar, 'right')
+    my_hover = HoverTool(names=['House'])
+
+    if layer['kind'] == 'points':
+        my_hover.tooltips = POINT_TOOLTIPS.get(field, [('', '@Neighborhood')])
+        # Dots for Houses
+        fig.circle(x="x_merc", y="y_merc",
+                size=7,
+                fill_color=mycolors, line_color='black', line_width=0.5,
+                fill_alpha=0.8,
+                name='House',
+                source=ColumnDataSource(layer['data']))
+    else:
+        my_hover.tooltips = [('Houses', '@counts')] + HEX_TOOLTIPS.get(field, [('', '@label')])
+        # Hexagons for aggregated houses
+        fig.hex_tile(q='q', r='r', size=layer['size'],
+                fill_color=mycolors, line_color=None,
+                fill_alpha=0.8,
+                name='House',
+                source=ColumnDataSource(layer['data']))
+    fig.add_tools(my_hover)
+
+    # Big Dots for Landmarks, with Hover interactivity
+    my_hover = HoverTool(names=['landmark'])
+    my_hover.tooltips = [('', '@landmarks')]
+    fig.circle(x="x_merc", y="y_merc",
+            size=18,
+            fill_color="pink", line_color='red',
+            fill_alpha=0.8,
+            name='landmark',
+            source=marks)
+    fig.add_tools(my_hover)
+
+    return fig
+
+def render(model_sec, model_neib):
+    with st.container():
+        st.title('Map of Ames')
+        col1, col2 = st.columns([3, 1]) #Set Columns
+
+        # Sidebar Radio Button
+        # For selecting map plot
+        map_choice = col2.radio("Choose Map:", ('SalePrice', 'Neighborhood', 'Sector', 'Renovation Uplift'))
+
+        if map_choice == 'Renovation Uplift':
+            # predicted gain of one renovation for every house it applies to, city-wide or in the sidebar's sector
+            renovation = col2.selectbox('Renovation', list(RENOVATIONS))
+            scope = col2.radio('Houses', ('Whole city', 'Selected sector'))
+            measure = col2.radio('Uplift in', ('Dollars', 'Percent'))
+            col1.write(f'Data: {renovation} uplift')
+            with phase('map layer'):
+                layer, summary = load_uplift_layer(data_version(), renovation,
+                                                   model_sec if scope == 'Selected sector' else None,
+                                                   'Uplift' if measure == 'Dollars' else 'UpliftPct')
+            col2.metric('Median uplift', f"${summary['median']:,.0f}", f"{summary['median_pct']:.1f}%")
+            col2.caption(f"{summary['houses']:,} houses where the renovation applies")
+        else:
+            col1.write(f'Data: {map_choice}')
+            with phase('map layer'):
+                layer = load_map_layer(data_version(), map_choice)
+        with phase('bokeh figure'):
+            fig = bok_layer(layer)
+        with phase('bokeh serialise'):
+            col1.bokeh_chart(fig)
+
+        with col1.expander("Sidenote on Distance from Walmart vs YearBuilt"):
+            st.write("""
+                Distance from Walmart correlates with YearBuilt? (R2 = 0.7)
+            """)
+            st.image(asset_path('Walmart_YrBuilt.png'))
+
+        with col1.expander("Ames Visitor Map"):
+            st.write("""
+                City Sectors from The Ames Convention & Visitors Bureau
+            """)
+            st.image(asset_path('Ames.png'))
+
+        with col1.expander("K-means Classifier results"):
+            st.write("""
+                Elbow Plot and Set K=6
+            """)
+            st.image(asset_path('K_means_elbow.png'))
+            st.image(asset_path('K_means_map.png'))
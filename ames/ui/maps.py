@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from bokeh.models import ColumnDataSource, WMTSTileSource
+from bokeh.plotting import figure
+from bokeh.util.hex import cartesian_to_axial
+
+from ames.config import MAP_POINT_LIMIT
+from ames.houses import NEIGHBORHOODS, SECTORS
+from ames.tiles import ATTRIBUTION, tile_url
+from ames.utils import to_mercator
+
+#=======================================================================================================
+# Bokeh map helpers shared by the "Map of Ames" and "Renovation Model" pages
+landmarks = {'landmarks':['Iowa State University',
+                          'Municipal Airport',
+                          'North Grand Mall',
+                          'Mary Greeley Medical Center',
+                          'Jack Trice Stadium',
+                          'Walmart Supercenter'],
+            'x_merc':[to_mercator(42.0267,-93.6465)[0],
+                      to_mercator(41.9987,-93.6223)[0],
+                      to_mercator(42.0494,-93.6224)[0],
+                      to_mercator(42.0323,-93.6111)[0],
+                      to_mercator(42.0140,-93.6359)[0],
+                      to_mercator(42.0160016, -93.6068719)[0]],
+            'y_merc':[to_mercator(42.0267,-93.6465)[1],
+                      to_mercator(41.9987,-93.6223)[1],
+                      to_mercator(42.0494,-93.6224)[1],
+                      to_mercator(42.0323,-93.6111)[1],
+                      to_mercator(42.0140,-93.6359)[1],
+                      to_mercator(42.0160016, -93.6068719)[1]]}
+marks = pd.DataFrame(landmarks)
+
+Ames_center = to_mercator(42.034534, -93.620369)
+
+# Mapper Function
+def bok_fig(w=940, h=700, box_select=False):
+    # Base Map Layer
+    if not box_select:
+        fig = figure(plot_width=w, plot_height=h,
+                    x_range=(Ames_center[0]-8000, Ames_center[0]+3000), 
+                    y_range=(Ames_center[1]-8000, Ames_center[1]+5000),
+                    x_axis_type="mercator", y_axis_type="mercator",
+                    title="Ames Iowa Housing Map")
+    else:
+        fig = figure(plot_width=w, plot_height=h,
+                    x_range=(Ames_center[0]-8000, Ames_center[0]+3000), 
+                    y_range=(Ames_center[1]-8000, Ames_center[1]+5000),
+                    x_axis_type="mercator", y_axis_type="mercator",
+                    title="Ames Iowa Housing Map",
+                    tools="box_select", active_drag="box_select")
+    # a new tile source per figure, bokeh models can only belong to one document
+    # tiles come from the local tile server when AMES_TILE_URL is set and answering (ames.tiles)
+    fig.add_tile(WMTSTileSource(url=tile_url(), attribution=ATTRIBUTION))
+    return fig
+
+def to_source(data):
+    # ColumnDataSource with the index as a column, categorical columns decoded to plain arrays
+    return ColumnDataSource({col: np.asarray(values) for col, values in data.reset_index().items()})
+
+#------------------------------------------------------------------------------------------------------
+# Map layers
+# Only the coordinates and the fields a map choice colours and hovers on are sent to the browser.
+# Above MAP_POINT_LIMIT houses the layer is aggregated into hexagons on the server, so the payload
+# depends on the map extent and HEX_SIZE, not on the number of houses.
+MAP_LAYERS = {'SalePrice': ('SalePrice', 'SalePrice'),
+              'Neighborhood': ('le_Neighbor', 'Neighborhood'),
+              'Sector': ('le_Sector', 'Neighborhood')}
+HEX_LABELS = {'le_Neighbor': NEIGHBORHOODS, 'le_Sector': SECTORS}
+HEX_SIZE = 120  # mercator units, ~90 m in Ames
+HEX_DECIMALS = {'UpliftPct': 2}  # hexagon means are rounded to whole units otherwise
+UPLIFT_COLOR_RANGE = (2, 98)  # percentiles of the uplift spanned by the palette
+
+def map_layer(map_data, map_choice, limit=MAP_POINT_LIMIT, size=HEX_SIZE):
+    # {'kind': 'points' or 'hex', 'field': colour column, 'low'/'high': colour range, 'data': columns}
+    field, hover = MAP_LAYERS[map_choice]
+    return field_layer(map_data, field, hover, limit, size)
+
+def field_layer(map_data, field, hover, limit=MAP_POINT_LIMIT, size=HEX_SIZE):
+    # numeric fields are averaged per hexagon, neighborhood/sector codes take the most common one
+    values = np.asarray(map_data[field])
+    layer = {'field': field, 'low': values.min() if len(values) else 0, 'high': values.max() if len(values) else 0,
+             'size': size}
+    if len(map_data) <= limit:
+        layer['kind'] = 'points'
+        layer['data'] = {'x_merc': map_data['x_merc'].values, 'y_merc': map_data['y_merc'].values,
+                         field: values, hover: np.asarray(map_data[hover])}
+        return layer
+
+    q, r = cartesian_to_axial(map_data['x_merc'].values, map_data['y_merc'].values, size, 'pointytop')
+    bins = pd.DataFrame({'q': q, 'r': r, field: values})
+    if field not in HEX_LABELS:
+        agg = bins.groupby(['q', 'r'])[field].agg(['size', 'mean']).reset_index()
+        data = {'q': agg['q'].values, 'r': agg['r'].values, 'counts': agg['size'].values,
+                field: np.round(agg['mean'].values, HEX_DECIMALS.get(field, 0))}
+    else:
+        # colour by the most common neighborhood/sector of each hexagon
+        counts = bins.groupby(['q', 'r', field]).size().rename('n').reset_index()
+        top = counts.sort_values('n', kind='stable').drop_duplicates(['q', 'r'], keep='last')
+        total = counts.groupby(['q', 'r'])['n'].sum()
+        top = top.join(total.rename('counts'), on=['q', 'r'])
+        data = {'q': top['q'].values, 'r': top['r'].values, 'counts': top['counts'].values,
+                field: top[field].values,
+                'label': np.asarray(HEX_LABELS[field])[top[field].values.astype(int)]}
+    layer['kind'] = 'hex'
+    layer['data'] = data
+    return layer
+
+def uplift_layer(map_data, result, field='Uplift', limit=MAP_POINT_LIMIT, size=HEX_SIZE):
+    # layer of the houses a renovation applies to (see ames.optimizer.uplift), coloured by
+    # 'Uplift' (dollars) or 'UpliftPct'; map_data rows must be in the order the uplift was scored in
+    applies = result['applies']
+    houses = pd.DataFrame({'x_merc': map_data['x_merc'].values[applies],
+                           'y_merc': map_data['y_merc'].values[applies],
+                           'Uplift': result['uplift'][applies],
+                           'UpliftPct': np.round(result['uplift_pct'][applies], 2)})
+    layer = field_layer(houses, field, 'UpliftPct' if field == 'Uplift' else 'Uplift', limit, size)
+    if len(houses):
+        # a few very large gains would wash out the colours, values outside the range take the end colours
+        layer['low'], layer['high'] = np.percentile(houses[field], UPLIFT_COLOR_RANGE)
+    return layer
@@ -0,0 +1,305 @@
+import time
+from concurrent.futures import TimeoutError
+import pandas as pd
+import streamlit as st
+from bokeh.models import CustomJS, DataTable, TableColumn, HTMLTemplateFormatter
+from bokeh.palettes import Spectral11
+from bokeh.transform import linear_cmap
+from streamlit_bokeh_events import streamlit_bokeh_events
+
+from ames.explain import explanation_frame
+from ames.intervals import LEVEL
+from ames.optimizer import DEFAULT_COSTS, best_renovations
+from ames.instrument import phase
+from ames.models import MODELS
+from ames.reno import NO_RENO, RENO_COLUMNS, RENO_LABELS, reno_vector
+from ames.spatial import comparable_sales
+from ames.ui.common import (load_base_explanations, load_data, load_encoder, load_explainer, load_house_table, load_intervals, load_model, load_predictor, load_rankings, load_registry, load_reno_lookup,
+                            load_spatial_index)
+from ames.ui.maps import bok_fig, to_source
+from ames.utils import num_format
+
+#------------------------------------------------------------------------------------------------------
+# Page 6 Modeling
+money_format = {'Cost': '${:,.0f}', 'Price': '${:,.0f}', 'Uplift': '${:,.0f}', 'Uplift per $': '{:.2f}'}
+INTERVAL_WAIT = 0.5  # seconds the end of the page waits for both prediction intervals together
+
+def box_layer(address_df, low, high, fig=None):
+    fig = fig or bok_fig(300,260,True)
+    # Set map data, hover tool, and color palette
+    mycolors = linear_cmap(field_name='SalePrice', palette=Spectral11, low=low, high=high)
+    #my_hover = HoverTool(names=['House'])
+    #my_hover.tooltips = [('Price', '@SalePrice')]
+    #fig.add_tools(my_hover)
+    # Dots for Houses
+    fig.circle(x="x_merc", y="y_merc",
+            size=7,
+            fill_color=mycolors, line_color='black', line_width=0.5,
+            fill_alpha=0.8,
+            name='House',
+            source=to_source(address_df))
+    fig.xaxis.visible = False
+    fig.yaxis.visible = False
+    fig.title.visible = False
+    return fig
+
+def render_budget(pkl_basehouse, address_df, model_neib):
+    # Best renovations for my budget: every feasible combination of the selected house scored in one
+    # batched predict; the neighborhood ranking is read from the renovation table and cached per inputs
+    col_in, col_out = st.columns([1,3])
+    budget = col_in.number_input('Budget ($)', min_value=0, value=50000, step=5000)
+    costs = {}
+    for col, label in zip(RENO_COLUMNS, ('Bathroom (each)',) + RENO_LABELS):
+        costs[col] = col_in.number_input(f'{label} cost ($)', min_value=1, value=DEFAULT_COSTS[col],
+                                         step=1000, key=f'cost_{col}')
+
+    pkl_model = load_model()
+    encoder = load_encoder()
+    col_out.markdown('##### Selected house')
+    ranked = best_renovations(pkl_model, encoder, encoder.encode(pkl_basehouse), costs, budget)
+    if ranked.empty:
+        col_out.caption('No renovation fits this budget')
+    else:
+        col_out.dataframe(ranked.style.format(money_format))
+
+    col_out.markdown(f'##### Best value houses in {model_neib}')
+    best = load_rankings().rank(address_df.index.values, costs, budget)
+    best.insert(1, 'Address', [address_df.loc[pid, 'Prop_Addr'] for pid in best['PID']])
+    col_out.dataframe(best.drop(columns='PID').head(20).style.format(money_format))
+
+def show_interval(placeholder, interval, wait=INTERVAL_WAIT):
+    # fills in a placeholder once the background interval is ready; nothing reruns the page by itself,
+    # so a slow one shows once the user changes an input
+    try:
+        low, high = interval.result(timeout=wait)
+    except TimeoutError:
+        placeholder.caption('Interval still computing, change any input to show it')
+        return
+    placeholder.caption(f'Model uncertainty ({LEVEL:.0%}): ${num_format(low)} - ${num_format(high)}  \n'
+                        'Spread of the model\'s own sub-models: narrow, and not the range of sale prices')
+
+def render_explanation(basehouse_PIN, pkl_basehouse, reno_vec):
+    # Per-feature contributions to the base and renovated price: the base house comes from the
+    # precomputed table, the renovated one is computed once per (PID, renovation) and cached
+    explanations = load_base_explanations()
+    explainer = load_explainer()
+    encoder = explainer.encoder
+    X = encoder.encode(pkl_basehouse)
+    base_shap = explanations.base(basehouse_PIN)
+    if base_shap is None:
+        base_shap = explainer.explain(basehouse_PIN, X, NO_RENO)
+    reno_shap = explainer.explain(basehouse_PIN, X, reno_vec) if reno_vec != NO_RENO else base_shap
+    frame = explanation_frame(encoder.columns, X[0], base_shap, encoder.apply(X, reno_vec)[0], reno_shap)
+    st.caption(f'Contributions are added to the average model price of ${num_format(explanations.expected)}. '
+               'Features changed by the renovation are listed first.')
+    st.dataframe(frame.style.format({'Base contribution': '${:,.0f}', 'Renovated contribution': '${:,.0f}',
+                                     'Change': '${:+,.0f}'}))
+
+def render(model_sec, model_neib):
+    map_data = load_data('map_data')
+    houses = load_house_table()
+    reno_table = load_reno_lookup()
+    spatial = load_spatial_index()
+    basehouse_PIN = 535454150
+
+    with st.container():
+        st.title('Renovation Modeler')
+        col_main, col_empty, col_b, col_bpx, col_r, col_rpx = st.columns([3,0.3,2,2,2,2]) #Set Columns
+        col_main.markdown('##### Select House')
+        col_b.markdown('##### Details')
+        col_r.markdown('##### Renovation')
+    
+    with st.container():
+        col_main, col_empty, col_b, col_bpx, col_r, col_rpx = st.columns([3,0.3,2,2,2,2]) #Set Columns
+
+        #------Set Base Prediction House---------
+        #model_sec = sec_mapper[sec_select]
+        #model_neib = col_main.radio('Select Neighborhood',map_data.loc[map_data.Sector==model_sec]['Neighborhood'].unique())
+        #pkl_basehouse = pkl_dum_encode(pkl_basehouse, model_neib, 'Neighborhood_')
+
+        #**********************
+        with col_main.container():
+
+            address_df = map_data.iloc[spatial.area(model_sec, model_neib)]
+
+            source = to_source(address_df)
+            template = """
+                <div style="font-weight: 600; 
+                    color: black"> 
+                <%= value %>
+                </div>
+                """
+            formatter = HTMLTemplateFormatter(template=template)
+            columns = [TableColumn(field="Prop_Addr", title="House Address", formatter=formatter)]
+
+            # define events
+            source.selected.js_on_change("indices",
+                CustomJS(args=dict(source=source),
+                code="""
+                document.dispatchEvent(
+                new CustomEvent("INDEX_SELECT", {detail: {data: source.selected.indices}})
+                )
+                """)
+                )
+
+            mytable = DataTable(source=source, columns=columns, height=300)
+            with phase('bokeh serialise'):
+                result = streamlit_bokeh_events(
+                    bokeh_plot=mytable, 
+                    events="INDEX_SELECT", 
+                    key="House", 
+                    refresh_on_update=True, 
+                    debounce_time=0,
+                    override_height=300)
+
+            if result:
+                if result.get("INDEX_SELECT"):
+                    st.markdown(f'#### **{address_df.iloc[result.get("INDEX_SELECT")["data"],13].values[0]}**')
+                    basehouse_PIN = address_df.index.values[result.get("INDEX_SELECT")["data"]][0]
+            pkl_basehouse = houses.rows([basehouse_PIN], 'pickle_data')
+
+        hstype_mapper = {1:'Duplex or 2-Family', 2:'2-Story Townhouse', 3:'Split Foyer', 
+                        4:'1-Story Townhouse', 5:'1-Story House', 6:'2-Story House'}
+        col_main.caption(f"{hstype_mapper[pkl_basehouse['MSSubClass'].values[0]]} in {model_neib}")
+
+        with phase('bokeh figure'):
+            box_fig = box_layer(address_df, map_data.SalePrice.min(), map_data.SalePrice.max())
+        with phase('bokeh serialise'):
+            col_main.bokeh_chart(box_fig)
+        #model_hstype = col_main.radio('Select Type of House',map_data.loc[map_data.Neighborhood==model_neib]['MSSubClass'].unique())
+        #pkl_basehouse = pkl_dum_encode(pkl_basehouse, model_hstype, 'MSSubClass_')
+
+        # Set & Display Selected Neighborhood and HouseType medians
+        
+        #pkl_basehouse['GoodLivArea'] = basehouse_medians.loc[(model_neib, model_hstype)]['GoodLivArea']
+        #col_main.caption(f"Median SquareFootage: {num_format(pkl_basehouse['GoodLivArea'][0])}")
+        #pkl_basehouse['YearBuilt'] = basehouse_medians.loc[(model_neib, model_hstype)]['YearBuilt']
+        #col_main.caption(f"Median Year Built: {str(pkl_basehouse['YearBuilt'][0])}")
+        #pkl_basehouse['PorchArea'] = basehouse_medians.loc[(model_neib, model_hstype)]['PorchArea']
+        #pkl_basehouse['GarageCars'] = 1
+        Qual_mapper = {1: 'Fair',2: 'Average', 3: 'Good', 4: 'Excellent'}
+
+        # HOUSE RENO Details
+        # Above Ground Bathrooms
+        col_b.markdown(f"Bathrooms (abv ground): **{num_format(pkl_basehouse['AllBathAbv'].values[0])}**")
+        reno_AGbaths = col_r.slider('Build Bathrooms', 0.0, 2.0, 0.0, 0.5)
+        reno_Kitchen = reno_Bsmt = reno_FinBsmt = reno_Garage = reno_pool = reno_cAir = reno_pave = 'No'
+
+        # Kitchen Quality
+        try:
+            col_b.markdown(f"Kitchen Quality: **{Qual_mapper[pkl_basehouse['KitchenQual'].values[0]]}**")
+            reno_Kitchen = col_r.radio('Remodel Kitchen',['No', 'Yes'])
+        except:
+            col_b.markdown(f"Kitchen Quality: **None**")
+
+        # Basement Condition
+        try:
+            col_b.markdown(f"Basement Condition: **{Qual_mapper[pkl_basehouse['BsmtCond'].values[0]]}**")
+            reno_Bsmt = col_r.radio('Remodel Basement',['No', 'Yes'])
+            reno_FinBsmt = col_r.radio('Finish Basement',['No', 'Yes'])
+        except:
+            col_b.markdown(f"No Basement")
+
+
+        # Garage Quality
+        try:
+            col_b.markdown(f"Garage Quality: **{Qual_mapper[pkl_basehouse['GarageQual'].values[0]]}**")
+            reno_Garage = col_r.radio('Remodel Garage',['No', 'Yes'])
+        except:
+            col_b.markdown(f"No Garage")
+        
+
+        # Pool
+        if pkl_basehouse['HasPool'].values[0] == 0:
+            base_pool = col_b.radio('Pool',['No'])
+            reno_pool = col_r.radio('Build Pool',['No', 'Yes'])
+        else:
+            base_pool = col_b.radio('Pool',['Yes'])
+        
+        # Central Air
+        if pkl_basehouse['CentralAir'].values[0] == 0:
+            base_cAir = col_b.radio('Central Air',['No'])
+            reno_cAir = col_r.radio('Install Central Air',['No', 'Yes'])
+        else:
+            base_cAir = col_b.radio('Central Air',['Yes'])
+        
+        # Paved Driveway
+        if pkl_basehouse['PavedDrive'].values[0] == 0:
+            base_pave = col_b.radio('Paved Driveway',['No'])
+            reno_pave = col_r.radio('Pave Driveway',['No', 'Yes'])
+        else:
+            base_pave = col_b.radio('Paved Driveway',['Yes'])
+
+        reno_vec = reno_vector(reno_AGbaths, reno_Kitchen == 'Yes', reno_Bsmt == 'Yes', reno_FinBsmt == 'Yes',
+                               reno_Garage == 'Yes', reno_pool == 'Yes', reno_cAir == 'Yes', reno_pave == 'Yes')
+
+        # Prices come from the precomputed table, live model predictions are the fallback
+        if reno_table is not None and basehouse_PIN in reno_table:
+            with phase('price lookup'):
+                pkl_baseprice = reno_table.lookup(basehouse_PIN, NO_RENO)
+                pkl_renoprice = reno_table.lookup(basehouse_PIN, reno_vec)
+        else:
+            predictor = load_predictor()
+            X = predictor.encoder.encode(pkl_basehouse)
+            pkl_baseprice, pkl_renoprice = predictor.prices(basehouse_PIN, X, [NO_RENO, reno_vec])
+        # Intervals are computed in the background and filled in at the end of the page
+        intervals = load_intervals().submit(basehouse_PIN, load_encoder().encode(pkl_basehouse), [NO_RENO, reno_vec])
+
+        # Base House MODEL PRICE
+        col_bpx.subheader(f'**${num_format(pkl_baseprice)}**')
+        col_bpx.caption('Baseline Price Prediction')
+        base_interval = col_bpx.empty()
+        col_bpx.write('-------------------------')
+        col_bpx.caption(f"Actual Price: **${num_format(pkl_basehouse['SalePrice'].values[0])}**")
+        col_bpx.markdown(f"Livable Space: **{num_format(pkl_basehouse['GoodLivArea'].values[0])}** sf")
+        col_bpx.markdown(f"Unfinished Bsmt: **{num_format(pkl_basehouse['BsmtUnfSF'].values[0])}** sf")
+        col_bpx.markdown(f"Garage Size: **{num_format(pkl_basehouse['GarageCars'].values[0])}** cars")
+        col_bpx.markdown(f"Porch or Deck: **{num_format(pkl_basehouse['PorchArea'].values[0])}** sf")
+        
+        # Renovated House PRICE
+        col_rpx.subheader(f'**${num_format(pkl_renoprice)}**')
+        col_rpx.caption('Renovated House Price')
+        reno_interval = col_rpx.empty()
+
+        # Added metric
+        percent_change = round((((pkl_renoprice - pkl_baseprice)/pkl_baseprice)*100),2)
+        # col_rpx.markdown(f'### **${num_format(pkl_renoprice - pkl_baseprice)}**')
+        col_rpx.metric(label='',value='${0}'.format(num_format(pkl_renoprice - pkl_baseprice)),delta='{0}%'.format(percent_change))
+        col_rpx.caption('Difference')
+
+        # Every model scores the same baseline + renovated matrix
+        if col_rpx.checkbox('Compare models'):
+            encoder = load_encoder()
+            X = encoder.scenarios(encoder.encode(pkl_basehouse), [NO_RENO, reno_vec])
+            labels = houses.rows([basehouse_PIN] * 2)  # the linear model reads the labels the codes merge
+            preds = load_registry().predict(X, labels=labels)
+            compare = pd.DataFrame({MODELS[name]['label']: {'Baseline': p[0], 'Renovated': p[1], 'Difference': p[1] - p[0]}
+                                    for name, p in preds.items()})
+            col_rpx.dataframe(compare.style.format('${:,.0f}'))
+
+    #------Price Explanation---------
+    with st.expander('Why this price?'):
+        render_explanation(basehouse_PIN, pkl_basehouse, reno_vec)
+
+    #------Comparable Sales---------
+    with st.expander('Nearest comparable sales'):
+        st.caption('Closest sales of the same house type within 25% of its livable space, most similar first')
+        comps = comparable_sales(spatial, houses.houses, basehouse_PIN)
+        if comps.empty:
+            st.caption('No comparable sales found')
+        else:
+            st.dataframe(comps.rename(columns={'Prop_Addr': 'Address', 'SalePrice': 'Sale Price', 'GoodLivArea': 'Livable Space (sf)',
+                                               'YearBuilt': 'Year Built'})
+                         .style.format({'Sale Price': '${:,.0f}', 'Livable Space (sf)': '{:,.0f}', 'Distance (m)': '{:,.0f}'}))
+
+    #------Budget Mode---------
+    # only searched when switched on, the search scores every combination for every house shown
+    if st.checkbox('Best renovations for my budget'):
+        render_budget(pkl_basehouse, address_df, model_neib)
+
+    #------Prediction Intervals---------
+    # last, so the rest of the page is on screen while they are computed
+    with phase('intervals'):
+        deadline = time.monotonic() + INTERVAL_WAIT
+        for placeholder, interval in zip((base_interval, reno_interval), intervals):
+            show_interval(placeholder, interval, max(deadline - time.monotonic(), 0))
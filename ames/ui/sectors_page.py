@@ -0,0 +1,108 @@
+import io
+import os
+import threading
+import streamlit as st
+import seaborn as sns
+from matplotlib.figure import Figure
+
+from ames.config import asset_path
+from ames.instrument import phase
+from ames.store import decode_categories
+from ames.ui.common import data_version, per_release, release_houses, release_sector_counts
+from ames.utils import content_hash
+
+#------------------------------------------------------------------------------------------------------
+# Page 2 City Sector EDA
+# The chart only changes with the overlay and the data, so each one is rendered once to PNG bytes,
+# kept per (overlay, content hash) in memory and under assets/cache/sectors/, and served from there.
+# prewarm() renders all overlays in a background thread started by app.py.
+OVERLAYS = ('SalePrice', 'YearBuilt', 'OverallQual')
+SECTOR_ORDER = ['NW','SO','WE','SE','NO','DT']
+FIGURE_DIR = asset_path(os.path.join('cache', 'sectors'))
+_figures = {}
+_render_lock = threading.Lock()
+
+def stack_frame(sector_counts):
+    # percentage of houseClass in each Sector of city, from the house type counts (HouseTable.derived)
+    counts = decode_categories(sector_counts).pivot(index='MSSubClass', columns='Sector', values='n')
+    return counts / counts.sum()
+
+def plot_stacked(s_data, overlay=None, m_data=None):
+    # matplotlib's object API rather than pyplot, so figures can be rendered off the script thread
+    fig = Figure(figsize=(10,6))
+    ax1 = fig.subplots()
+    s_data.loc[:,SECTOR_ORDER].T.plot(ax=ax1, kind='bar', rot=0, width=0.8, stacked=True,
+                            color=sns.color_palette('gist_earth', len(s_data))).legend(bbox_to_anchor=(1.051, 1.0))
+    ax1.set_ylabel('Proportion')
+    ax2 = ax1.twinx()
+    sns.stripplot(ax=ax2, x='Sector', y=overlay, data=m_data, order=SECTOR_ORDER, color='0.6', edgecolor='k', linewidth=0.5)
+    return fig
+
+def data_hash(map_data):
+    return content_hash(map_data[['Sector', 'MSSubClass', *OVERLAYS]])
+
+def sector_png(map_data, sector_counts, overlay, key=None):
+    key = key or data_hash(map_data)
+    if (overlay, key) in _figures:
+        return _figures[(overlay, key)]
+    with _render_lock:
+        if (overlay, key) not in _figures:
+            path = os.path.join(FIGURE_DIR, f'{key}_{overlay}.png')
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    _figures[(overlay, key)] = f.read()
+            else:
+                buf = io.BytesIO()
+                plot_stacked(stack_frame(sector_counts), overlay, map_data).savefig(buf, format='png', bbox_inches='tight')
+                _figures[(overlay, key)] = buf.getvalue()
+                try:
+                    # written aside and renamed, so other processes never read a partial PNG
+                    os.makedirs(FIGURE_DIR, exist_ok=True)
+                    tmp = f'{path}.tmp{os.getpid()}'
+                    with open(tmp, 'wb') as f:
+                        f.write(buf.getvalue())
+                    os.replace(tmp, path)
+                except OSError:
+                    pass  # read-only assets, keep the in-memory copy
+    return _figures[(overlay, key)]
+
+def prewarm(map_data, sector_counts):
+    key = data_hash(map_data)
+    for overlay in OVERLAYS:
+        sector_png(map_data, sector_counts, overlay, key)
+    return key
+
+def forget_figures(keep):
+    # drops the in-memory PNGs of other data, once the release with hash keep is active
+    with _render_lock:
+        for key in [key for key in _figures if key[1] != keep]:
+            del _figures[key]
+
+@per_release
+def load_data_hash(version):
+    # one hash per data release (see ames.ui.common.data_version)
+    return data_hash(release_houses(version).view('map_data'))
+
+def render(model_sec, model_neib):
+    version = data_version()  # the data, counts and hash come from the same release
+    map_data = release_houses(version).view('map_data')
+    with st.container():
+        st.title('EDA with City Sectors')
+        col1, col2 = st.columns([3, 1]) #Set Columns
+
+        overlay_choice = col2.radio("Overlay Data:", OVERLAYS)
+
+        with phase('sector figure'):
+            png = sector_png(map_data, release_sector_counts(version), overlay_choice, load_data_hash(version))
+        col1.image(png, use_column_width=True)
+
+        with col1.expander("HouseType Comparisons"):
+            st.write("""
+                
+            """)
+            st.image(asset_path('HouseType.png'))
+
+        with col1.expander("Price per SF Analysis"):
+            st.image(asset_path('PperSF.png'))
+            st.write("Price per SF drops as house size increases in all Sectors, but most pronounced in SE, NO, & DT.")
+            st.write("The phenomenon is only seen in Split, Duplex or 2 Family houses.")
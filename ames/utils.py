@@ -0,0 +1,38 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+#=======================================================================================================
+# Helpers shared by the app pages and the offline tools (no streamlit imports here)
+
+def to_mercator(lat, lon):
+    r_major = 6378137.000
+    x = r_major * np.radians(lon)
+    scale = x/lon
+    y = 180.0/np.pi * np.log(np.tan(np.pi/4.0 + 
+        lat * (np.pi/180.0)/2.0)) * scale
+    return (x, y)
+
+def num_format(num):
+    # converts any int/float to human readable string with thousandth commas
+    new_num = ''
+    for idx, c in enumerate(str(np.int64(num))[::-1]):
+        if (idx+1)%4 == 0:
+            new_num += ','
+        new_num += c
+    return new_num[::-1]
+
+def pkl_dum_encode(base_data, code, feat):
+    # Encodes the feature selected with '1', all other dummy columns are set to '0'
+    reg_text = '^'+feat
+    target = feat+code
+    feat_cols = list(base_data.filter(regex=reg_text).columns)
+    base_data.loc[0,feat_cols] = 0
+    if target in feat_cols:
+        feat_cols.remove(target)
+        base_data.loc[0,target] = 1
+    return base_data
+
+def content_hash(data):
+    # short, process-independent hash of a DataFrame's index and values, for cache keys
+    return hashlib.sha1(pd.util.hash_pandas_object(data).values.tobytes()).hexdigest()[:16]
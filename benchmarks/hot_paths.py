@@ -0,0 +1,158 @@
+import argparse
+import io
+import json
+import os
+import sys
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+#=======================================================================================================
+# Headless benchmarks of the app's hot paths (no browser, no Streamlit server)
+# Each case is timed over --repeat runs and reported as median time, throughput and the peak
+# Python/numpy allocation of one traced run. Results are compared against a stored baseline and
+# the script exits non-zero when any case's best time is slower than baseline * (1 + threshold)
+# (best times are far less noisy than medians for millisecond cases):
+#
+#   python benchmarks/hot_paths.py --save-baseline      # on the reference machine / commit
+#   python benchmarks/hot_paths.py --threshold 0.25     # after a change
+#
+# Baselines are machine specific and not committed; --require-baseline fails when there is none, so a
+# scripted check cannot pass without comparing anything.
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT_DIR, 'benchmarks', 'baselines', 'hot_paths.json')
+LEGACY_CSV = {'map_data': 'APP_data_all.csv', 'house_data': 'model_data.csv',
+              'page_3_data': 'page_3_data.csv', 'pickle_data': 'pickle_base.csv'}
+
+def cases():
+    # (name, function, items processed per call, unit); setup happens here, outside the timings
+    sys.path.insert(0, ROOT_DIR)
+    from bokeh.embed import json_item
+    from ames.config import asset_path
+    from ames.houses import VIEWS, load_houses
+    from ames.models import ModelRegistry
+    from ames.reno import reno_encoder
+    from ames.utils import num_format, pkl_dum_encode, to_mercator
+    from ames.ui.map_page import bok_layer
+    from ames.ui.maps import map_layer
+    from ames.ui.reno_page import box_layer
+    from ames.ui.sectors_page import plot_stacked, stack_frame
+
+    table = load_houses()
+    map_data = table.view('map_data')
+    n = len(table)
+    out = []
+
+    for name in VIEWS:
+        out.append((f'load_data {name}', lambda name=name: load_houses().view(name), n, 'rows'))
+        out.append((f'read_csv {LEGACY_CSV[name]}',
+                    lambda name=name: pd.read_csv(asset_path(LEGACY_CSV[name]), index_col='PID'), n, 'rows'))
+
+    lat = np.random.default_rng(0).uniform(41.98, 42.07, 100000)
+    lon = np.random.default_rng(1).uniform(-93.70, -93.55, 100000)
+    out.append(('to_mercator 100k', lambda: to_mercator(lat, lon), len(lat), 'points'))
+
+    prices = table.houses['SalePrice'].values
+    out.append(('num_format', lambda: [num_format(p) for p in prices], n, 'calls'))
+
+    dummies = pd.get_dummies(table.view('house_data').drop(columns='SalePrice').iloc[:1]).reset_index(drop=True)
+    out.append(('pkl_dum_encode', lambda: pkl_dum_encode(dummies.copy(), 'NAmes', 'Neighborhood_'), 1, 'calls'))
+
+    model = ModelRegistry().get('CBR')
+    encoder = reno_encoder(model)
+    X = encoder.encode(table.view('pickle_data'))
+    rows = X[:200]
+    out.append(('predict single-row x200', lambda: [model.predict(rows[i:i+1]) for i in range(len(rows))],
+                len(rows), 'rows'))
+    out.append(('predict batched (all PIDs)', lambda: model.predict(X), n, 'rows'))
+
+    for choice in ('SalePrice', 'Neighborhood'):
+        layer = map_layer(map_data, choice)
+        out.append((f'bok_layer {choice}', lambda layer=layer: json_item(bok_layer(layer)), 1, 'figures'))
+    address_df = map_data.loc[map_data['Neighborhood'] == 'NAmes']
+    low, high = map_data['SalePrice'].min(), map_data['SalePrice'].max()
+    out.append(('box_layer', lambda: json_item(box_layer(address_df, low, high)), 1, 'figures'))
+
+    stack = stack_frame(table.derived('sector_counts'))
+    def render_stacked():
+        buf = io.BytesIO()
+        plot_stacked(stack, 'SalePrice', map_data).savefig(buf, format='png', bbox_inches='tight')
+        return buf
+    out.append(('plot_stacked png', render_stacked, 1, 'figures'))
+    return out
+
+def run_case(fn, repeat):
+    fn()  # warm-up: imports, lazy initialisation
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        times.append(perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'median_s': float(np.median(times)), 'min_s': min(times), 'peak_mb': peak / 2**20}
+
+def compare(results, baseline, threshold):
+    # names of the cases slower than their baseline by more than threshold
+    slower = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base and r['min_s'] > base['min_s'] * (1 + threshold):
+            slower.append(name)
+    return slower
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths of the app against a stored baseline')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='*', default=None, help='run the cases whose name starts with any of these')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown over the baseline best time, as a fraction (default 0.25)')
+    parser.add_argument('--json', default=None, help='also write the raw results to this file')
+    parser.add_argument('--require-baseline', action='store_true', help='exit with 2 when there is no baseline')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    print(f"{'case':<34}{'median (ms)':>12}{'throughput':>20}{'peak (MB)':>11}{'vs base':>9}")
+    for name, fn, items, unit in cases():
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        r = results[name] = run_case(fn, args.repeat)
+        r['throughput'] = items / r['median_s']
+        r['unit'] = unit
+        change = f"{r['min_s'] / baseline[name]['min_s'] - 1:+.0%}" if name in baseline else ''
+        print(f"{name:<34}{1000*r['median_s']:>12.2f}{r['throughput']:>14,.0f} {unit+'/s':<7}"
+              f"{r['peak_mb']:>9.1f}{change:>9}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({'results': {**baseline, **results}}, f, indent=2)
+        print(f'baseline saved to {args.baseline}')
+        return 0
+
+    slower = compare(results, baseline, args.threshold)
+    if slower:
+        print(f"{len(slower)} case(s) more than {args.threshold:.0%} slower than the baseline: {', '.join(slower)}")
+        return 1
+    if not baseline:
+        print(f'no baseline at {args.baseline}, nothing was compared; record one with --save-baseline '
+              '(see "Hot path benchmarks" in the README)')
+        return 2 if args.require_baseline else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import resource
+import runpy
+import subprocess
+import sys
+from time import perf_counter
+
+#=======================================================================================================
+# Startup / rerun benchmark for the Streamlit script
+# Each page runs in a fresh process: the first run of the script is the cold start, the following
+# runs are reruns with warm caches. Streamlit runs in "bare" mode, so no browser or server is needed.
+#
+#   python benchmarks/startup.py                          # current app.py
+#   git show <old-commit>:app.py > /tmp/app_before.py
+#   python benchmarks/startup.py --script /tmp/app_before.py   # same numbers for an older version
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["Map of Ames", "City Sectors", "House Features", "Renovation Model", "Collaborators"]
+
+def run_child(script, page, reruns):
+    # runs inside the subprocess and prints one JSON line
+    t0 = perf_counter()
+    import streamlit
+    from streamlit.delta_generator import DeltaGenerator
+    import_streamlit = perf_counter() - t0
+
+    # the navigation radio returns the page under test instead of its default
+    radio = DeltaGenerator.radio
+    def nav_radio(self, label, options, *args, **kwargs):
+        if label == 'Navigation':
+            return page
+        return radio(self, label, options, *args, **kwargs)
+    DeltaGenerator.radio = nav_radio
+
+    os.chdir(ROOT_DIR)
+    sys.path.insert(0, ROOT_DIR)
+    times = []
+    for _ in range(reruns + 1):
+        t = perf_counter()
+        runpy.run_path(script, run_name='__main__')
+        times.append(perf_counter() - t)
+    print(json.dumps({'page': page,
+                      'import_streamlit': import_streamlit,
+                      'cold': times[0],
+                      'reruns': times[1:],
+                      'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+def run_page(script, page, reruns, prewarm=True):
+    env = dict(os.environ, AMES_PREWARM='1' if prewarm else '0')
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', page,
+                          '--script', script, '--reruns', str(reruns)],
+                         capture_output=True, text=True, check=True, env=env)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cold-start and per-page rerun times of the app script')
+    parser.add_argument('--script', default=os.path.join(ROOT_DIR, 'app.py'))
+    parser.add_argument('--reruns', type=int, default=5)
+    parser.add_argument('--pages', nargs='*', default=PAGES)
+    parser.add_argument('--no-prewarm', action='store_true',
+                        help='disable background figure rendering, which competes with the timed reruns')
+    parser.add_argument('--json', default=None, help='also write the raw results to this file')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    script = os.path.abspath(args.script)
+
+    if args.child:
+        run_child(script, args.child, args.reruns)
+        return
+
+    results = [run_page(script, page, args.reruns, not args.no_prewarm) for page in args.pages]
+    print(f"{'page':<18}{'cold (s)':>10}{'rerun (ms)':>12}{'max rss (MB)':>14}")
+    for r in results:
+        rerun_ms = 1000 * sum(r['reruns']) / max(len(r['reruns']), 1)
+        print(f"{r['page']:<18}{r['cold']:>10.2f}{rerun_ms:>12.1f}{r['max_rss_mb']:>14.0f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'script': script, 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()